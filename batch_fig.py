@@ -0,0 +1,132 @@
+import glob
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from memory_fig import size_text
+
+# la funzione che esegue uno script (fig.main): i worker la ereditano col
+# fork; dove il fork non c'è la caricano da sé
+_run = None
+# la riga che apre e chiude il riquadro di un errore (fig.format_error)
+ERROR_RULE = '=' * 50
+
+
+def find_jobs(target):
+    # una cartella vuol dire tutti i .fig che contiene, altrimenti è un glob
+    if os.path.isdir(target):
+        target = os.path.join(target, '*.fig')
+    return sorted(p for p in glob.glob(target, recursive=True)
+                  if p.endswith('.fig') and os.path.isfile(p))
+
+
+def input_file(path):
+    # job.fig legge le risposte per ask e listen for da job.in, se c'è
+    sidecar = path[:-4] + '.in'
+    return sidecar if os.path.isfile(sidecar) else None
+
+
+# ─── PARENT SIDE ───────────────────────────────────────
+def run_batch(target, jobs, run, args, report='figlang-batch.json'):
+    global _run
+    paths = find_jobs(target)
+    if not paths:
+        raise ValueError(f"no .fig files match '{target}'")
+    # l'interprete va caricato prima del fork: i worker partono già pronti
+    import lexer, parser, runtime
+    _run = run
+    workers = min(jobs or os.cpu_count() or 1, len(paths))
+    start = time.perf_counter()
+    results = []
+    # il fork va chiesto: su macOS e da Python 3.14 il metodo di default è un altro
+    context = (multiprocessing.get_context('fork')
+               if 'fork' in multiprocessing.get_all_start_methods() else None)
+    with ProcessPoolExecutor(workers, mp_context=context) as pool:
+        futures = [pool.submit(_run_job, p, args) for p in paths]
+        for path, future in zip(paths, futures):
+            try:
+                results.append(future.result())
+            except BrokenProcessPool:
+                results.append(_result(path, 1, '', 'worker process died\n', 0.0, 0))
+    elapsed = time.perf_counter() - start
+    passed = sum(1 for r in results if r['status'] == 'pass')
+    summary = {
+        'jobs': len(results), 'passed': passed, 'failed': len(results) - passed,
+        'seconds': round(elapsed, 3), 'workers': workers,
+    }
+    with open(report, 'w') as f:
+        json.dump({'summary': summary, 'results': results}, f, indent=2)
+    print_summary(summary, results, report)
+    return 0 if passed == len(results) else 1
+
+
+def print_summary(summary, results, report):
+    for r in results:
+        if r['status'] == 'fail':
+            print(f"  FAIL {r['file']}  {failure_reason(r)}")
+    slowest = max(results, key=lambda r: r['seconds'])
+    biggest = max(results, key=lambda r: r['peak_memory'])
+    print(f"{summary['jobs']} jobs: {summary['passed']} passed, "
+          f"{summary['failed']} failed in {summary['seconds']:.2f}s "
+          f"on {summary['workers']} workers")
+    print(f"  slowest: {slowest['file']} ({slowest['seconds']:.3f}s)")
+    print(f"  most memory: {biggest['file']} ({size_text(biggest['peak_memory'])})")
+    print(f"  report: {report}")
+
+
+def failure_reason(result):
+    # il riquadro di format_error, non la coda dell'output: dopo l'errore
+    # vengono gli avvisi e i suggerimenti
+    lines = [l.strip() for l in result['stdout'].splitlines()]
+    rules = [i for i, l in enumerate(lines) if l == ERROR_RULE]
+    if len(rules) >= 2:
+        block = lines[rules[0] + 1:rules[1]]
+        kind, rest = block[0].replace('FigLang ', '', 1), block[1:]
+        if rest and rest[0].startswith('on line '): kind += ' ' + rest.pop(0)
+        return f"{kind}: {rest[0]}" if rest else kind
+    # niente riquadro: un'eccezione fuori da main finisce su stderr
+    last = result['stderr'].strip().splitlines() or result['stdout'].strip().splitlines()
+    return next((l.strip() for l in reversed(last) if l.strip()), '')
+
+
+# ─── WORKER SIDE ───────────────────────────────────────
+def _run_job(path, args):
+    sidecar = input_file(path)
+    stdin = open(sidecar) if sidecar else io.StringIO()
+    out, err = io.StringIO(), io.StringIO()
+    saved = sys.stdin, sys.stdout, sys.stderr
+    sys.stdin, sys.stdout, sys.stderr = stdin, out, err
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        if _run is None:
+            from fig import main
+            code = main([path] + args) or 0
+        else:
+            code = _run([path] + args) or 0
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else 1
+    except BaseException as e:
+        print(f"{type(e).__name__}: {e}", file=err)
+        code = 1
+    finally:
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        sys.stdin, sys.stdout, sys.stderr = saved
+        stdin.close()
+    return _result(path, code, out.getvalue(), err.getvalue(), elapsed, peak)
+
+
+def _result(path, code, stdout, stderr, elapsed, peak):
+    return {
+        'file': path, 'status': 'pass' if code == 0 else 'fail', 'exit_code': code,
+        'seconds': round(elapsed, 4), 'peak_memory': peak,
+        'stdout': stdout, 'stderr': stderr,
+    }
@@ -0,0 +1,160 @@
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from lexer import tokenize
+from parser import parse
+from runtime import Runtime
+from output_fig import Output
+from memory_fig import size_text
+
+USAGE = """Usage: python bench_fig.py [options] [workload ...]
+
+Options:
+  --time S         seconds spent timing each phase (default 1)
+  --save FILE      write the results to FILE as a JSON baseline
+  --compare FILE   compare with a baseline saved earlier
+  --threshold PCT  slowdown that counts as a regression (default 10)"""
+
+FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench')
+# il carico "source": tutti gli script ripetuti, per lexer e parser
+SOURCE_COPIES = 20
+
+
+def workloads(names=()):
+    found = {}
+    for path in sorted(glob.glob(os.path.join(FOLDER, '*.fig'))):
+        with open(path) as f:
+            found[os.path.basename(path)[:-4]] = f.read()
+    found['source'] = '\n'.join(found.values()) * SOURCE_COPIES
+    unknown = [n for n in names if n not in found]
+    if unknown: raise ValueError(f"unknown workload: {', '.join(unknown)}")
+    return {n: s for n, s in found.items() if not names or n in names}
+
+
+def phases(name, source):
+    tokens = tokenize(source)
+    ast = parse(tokens)
+    steps = [('tokenize', lambda: tokenize(source)), ('parse', lambda: parse(tokens))]
+    if name != 'source': steps.append(('run', lambda: execute(ast)))
+    return steps
+
+
+def execute(ast):
+    rt = Runtime()
+    rt.out = Output(os.devnull)
+    rt.file_messages = False
+    try:
+        rt.run(ast)
+        rt.finish()
+    finally:
+        rt.close()
+
+
+def measure(fn, seconds):
+    # una passata di riscaldamento, poi ripetizioni finché c'è tempo;
+    # la memoria si misura a parte: tracemalloc rallenta tutto
+    fn()
+    runs, start = 0, time.perf_counter()
+    while True:
+        fn()
+        runs += 1
+        spent = time.perf_counter() - start
+        if spent >= seconds and runs >= 3: break
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'ops_per_sec': round(runs / spent, 3), 'peak_memory': peak}
+
+
+def run_all(names=(), seconds=1.0):
+    results = {}
+    # i carichi che scrivono file lo fanno in una cartella temporanea
+    here, loads = os.getcwd(), workloads(names)
+    print(f"[bench] {'workload':<12}{'phase':<10}{'speed':>18}{'peak memory':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            for name, source in loads.items():
+                for phase, fn in phases(name, source):
+                    results[f"{name}/{phase}"] = measure(fn, seconds)
+                    print_row(name, phase, results[f"{name}/{phase}"])
+        finally:
+            os.chdir(here)
+    return results
+
+
+def print_row(name, phase, result, change=None):
+    line = (f"  {name:<12}{phase:<10}{result['ops_per_sec']:>12.1f} ops/s"
+            f"{size_text(result['peak_memory']):>12}")
+    if change is not None: line += f"{change:>+9.1f}%"
+    print(line)
+
+
+# ─── BASELINES ─────────────────────────────────────────
+def save(results, path):
+    data = {'python': sys.version.split()[0], 'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'results': results}
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def compare(results, path, threshold):
+    with open(path) as f:
+        baseline = json.load(f)['results']
+    regressions = []
+    print(f"[bench] against {path} (regression: more than {threshold:g}% slower)")
+    for key, result in results.items():
+        if key not in baseline: continue
+        # ops/s più basse vuol dire più lento
+        change = (result['ops_per_sec'] / baseline[key]['ops_per_sec'] - 1) * 100
+        name, phase = key.split('/')
+        print_row(name, phase, result, change)
+        if change < -threshold: regressions.append(key)
+    for key in regressions: print(f"  REGRESSION {key}")
+    return regressions
+
+
+def main(args=None):
+    if args is None: args = sys.argv[1:]
+    opts, names, i = {}, [], 0
+    while i < len(args):
+        if args[i] in ('--time', '--save', '--compare', '--threshold'):
+            if i + 1 >= len(args):
+                print(f"option '{args[i]}' needs a value"); return 1
+            opts[args[i][2:]] = args[i + 1]
+            i += 2
+            continue
+        if args[i].startswith('-'):
+            print(USAGE); return 1
+        names.append(args[i])
+        i += 1
+    try:
+        seconds = float(opts.get('time', 1))
+        threshold = float(opts.get('threshold', 10))
+    except ValueError:
+        print('--time and --threshold need a number'); return 1
+    try:
+        results = run_all(names, seconds)
+    except ValueError as e:
+        print(e); return 1
+    if opts.get('save'):
+        save(results, opts['save'])
+        print(f"[bench] baseline written to '{opts['save']}'")
+    if opts.get('compare'):
+        try:
+            return 1 if compare(results, opts['compare'], threshold) else 0
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[bench] cannot read baseline '{opts['compare']}': {e}"); return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+
+from parallel_fig import names, walk_statements
+from runtime import Variable
+
+
+def cache_file():
+    # uno per utente, fuori dalla cartella del progetto
+    folder = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(folder, 'figlang', 'zones.sqlite')
+
+
+def open_cache(max_bytes):
+    # None se la cartella non si può scrivere o il database non si apre:
+    # allora le zone cached girano ogni volta
+    try:
+        return ZoneCache(max_bytes=max_bytes)
+    except (OSError, sqlite3.Error) as e:
+        print(f"FigLang: cannot open the zone cache ({e}), cached zones will run every time",
+              file=sys.stderr)
+        return None
+
+
+class ZoneCache:
+    # risultati delle zone "cached", conservati fra un'esecuzione e l'altra;
+    # ogni voce è un testo json: file letti, risultato, variabili, output;
+    # niente pickle, leggere la cache non può eseguire codice
+    def __init__(self, path=None, max_bytes=64 << 20):
+        self.path = path = path or cache_file()
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path) or '.', mode=0o700, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute('CREATE TABLE IF NOT EXISTS zones ('
+                        'key TEXT PRIMARY KEY, created REAL, used REAL, '
+                        'size INTEGER, data BLOB)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS zones_used ON zones (used)')
+
+    def get(self, key, now, ttl=None):
+        row = self.db.execute('SELECT created, data FROM zones WHERE key = ?',
+                              (key,)).fetchone()
+        if row is None:
+            return None
+        created, data = row
+        try:
+            files, result, written, lines = json.loads(data)
+        except (ValueError, TypeError):
+            files = None
+        # scaduta, illeggibile o con un file cambiato: si ricalcola
+        if files is None or (ttl is not None and now - created > ttl) \
+                or any(_stamp(p) != stamp for p, stamp in files):
+            with self.db:
+                self.db.execute('DELETE FROM zones WHERE key = ?', (key,))
+            return None
+        with self.db:
+            self.db.execute('UPDATE zones SET used = ? WHERE key = ?', (now, key))
+        return files, result, written, lines
+
+    def put(self, key, now, files, result, written, lines):
+        entry = [files, result, written, lines]
+        try:
+            data = json.dumps(entry)
+        except (TypeError, ValueError):
+            return
+        # json cambia tuple in liste e chiavi in stringhe: si tiene solo
+        # quello che torna identico
+        if json.loads(data) != entry: return
+        try:
+            with self.db:
+                self.db.execute('INSERT OR REPLACE INTO zones VALUES (?, ?, ?, ?, ?)',
+                                (key, now, now, len(data), data))
+                self._evict()
+        except sqlite3.Error:
+            # database in sola lettura o disco pieno: il risultato non si tiene
+            pass
+
+    def _evict(self):
+        # via le voci usate meno di recente finché si rientra nel limite
+        total = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM zones').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in self.db.execute('SELECT key, size FROM zones ORDER BY used'):
+            stale.append((key,))
+            total -= size
+            if total <= self.max_bytes: break
+        self.db.executemany('DELETE FROM zones WHERE key = ?', stale)
+
+    def close(self):
+        self.db.close()
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+class _Tee:
+    # passa l'output avanti e intanto se lo segna, per riprodurlo dalla cache
+    def __init__(self, out):
+        self.out = out
+        self.lines = []
+
+    def line(self, text=''):
+        self.lines.append(text)
+        self.out.line(text)
+
+    def flush(self):
+        self.out.flush()
+
+    def close(self):
+        self.out.close()
+
+
+def cache_key(runtime, name, args):
+    # il corpo della zona, gli argomenti e i valori dei nomi che legge; la
+    # cache è una sola per utente, e i percorsi relativi dipendono dalla cartella
+    body = runtime.zones[name]
+    used = sorted(names(body) - set(runtime.zone_params[name]))
+    inputs = [(n, runtime.variables[n].value) for n in used if n in runtime.variables]
+    maps = [(n, runtime.maps[n]) for n in used if n in runtime.maps]
+    blob = json.dumps([os.getcwd(), repr(body), args, inputs, maps], sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def run_cached(runtime, name, args, ttl):
+    try:
+        key = cache_key(runtime, name, args)
+    except (TypeError, ValueError):
+        return runtime.run_zone(name, args)
+    cache = runtime.zone_cache()
+    if cache is None: return runtime.run_zone(name, args)
+    hit = cache.get(key, runtime.clock.time(), ttl)
+    if hit is not None:
+        files, result, written, lines = hit
+        # una zona cached che chiama questa dipende anche dai suoi file
+        for reads in runtime.read_paths: reads.update(p for p, _ in files)
+        for text in lines: runtime.out.line(text)
+        for var, value in written.items():
+            if var in runtime.variables: runtime.variables[var].set(value)
+            else: runtime.variables[var] = Variable(value)
+        if runtime.debug_mode:
+            runtime.out.line(f"  [cache] '{name}' restored from cache")
+        return result
+
+    before = {k: (v, len(v.history)) for k, v in runtime.variables.items()}
+    tee = _Tee(runtime.out)
+    reads = set()
+    runtime.out = tee
+    runtime.read_paths.append(reads)
+    try:
+        result = runtime.run_zone(name, args)
+    finally:
+        runtime.out = tee.out
+        runtime.read_paths.remove(reads)
+
+    written = {}
+    for k, v in runtime.variables.items():
+        old = before.get(k)
+        if old is None or v is not old[0] or len(v.history) != old[1]:
+            written[k] = v.value
+    # "add ... to group" cambia la lista senza toccare la history
+    for stmt in walk_statements(runtime.zones[name]):
+        if stmt[0] == 'add_to_group' and stmt[2] in runtime.variables:
+            written[stmt[2]] = runtime.variables[stmt[2]].value
+    files = [[p, _stamp(p)] for p in sorted(os.path.abspath(r) for r in reads)]
+    cache.put(key, runtime.clock.time(), files, result, written, tee.lines)
+    return result
@@ -0,0 +1,126 @@
+import threading
+
+from lexer import tokenize
+from parser import parse
+from runtime import Runtime, Variable
+from logs_fig import LogBuffer
+from governor_fig import LimitExceeded
+from metrics_fig import asks_for_counts
+
+
+class Program:
+    # sorgente già analizzato: lexer e parser girano una volta sola,
+    # poi si esegue quante volte si vuole con input diversi
+    def __init__(self, ast, source='', name='<program>'):
+        self.ast = ast
+        self.source = source
+        self.name = name
+        self.counts = asks_for_counts(ast)
+
+    def run(self, variables=None, inputs=(), pool=None, limits=None):
+        pool = pool if pool is not None else default_pool
+        rt = pool.acquire()
+        out = _Lines()
+        rt.out = out
+        rt.logs = LogBuffer()
+        rt.input = _Inputs(inputs)
+        for name, value in (variables or {}).items():
+            rt.variables[name] = Variable(value)
+        limits = dict(limits or {})
+        # max_until non è un limite del Governor: vale solo per questa esecuzione
+        until = rt.max_until
+        rt.max_until = limits.pop('max_until', until)
+        governor = rt.govern(**limits) if limits else None
+        if self.counts: rt.metrics.start()
+        error = None
+        try:
+            rt.run(self.ast)
+            rt.finish()
+        except (Exception, LimitExceeded) as e:
+            error = e
+        finally:
+            if governor is not None: rt.remove_hooks(governor)
+            rt.governor = None
+            rt.max_until = until
+            rt.files.close()
+            state = {k: v.value for k, v in rt.variables.items()}
+            pool.release(rt)
+        return Result(out.lines, state, error)
+
+    def warnings(self):
+        from warnings_fig import analyze
+        return analyze(self.ast, self.source)
+
+
+class Result:
+    __slots__ = ('output', 'variables', 'error')
+
+    def __init__(self, output, variables, error=None):
+        self.output = output
+        self.variables = variables
+        self.error = error
+
+
+def compile_source(source, name='<program>'):
+    return Program(parse(tokenize(source)), source, name)
+
+
+def compile_file(path):
+    with open(path) as f:
+        return compile_source(f.read(), path)
+
+
+# ─── POOL ──────────────────────────────────────────────
+class RuntimePool:
+    # runtime già costruiti (tabelle di dispatch, file mappati, cache):
+    # al rilascio basta reset() invece di un Runtime() nuovo
+    def __init__(self, size=8):
+        self.size = size
+        self.idle = []
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            if self.idle: return self.idle.pop()
+        return Runtime()
+
+    def release(self, rt):
+        rt.reset()
+        rt.scheduler = None
+        with self.lock:
+            if len(self.idle) < self.size:
+                self.idle.append(rt)
+                return
+        rt.close()
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for rt in idle: rt.close()
+
+
+default_pool = RuntimePool()
+
+
+class _Lines:
+    def __init__(self):
+        self.lines = []
+
+    def line(self, text=''):
+        self.lines.append(text)
+
+    def flush(self): pass
+
+    def close(self): pass
+
+
+class _Inputs:
+    # risposte già pronte per ask e listen for, nell'ordine
+    def __init__(self, answers):
+        self.answers = iter(answers)
+
+    def __call__(self, prompt=''):
+        try:
+            return str(next(self.answers))
+        except StopIteration:
+            raise EOFError("FigLang: the program asked for more input than was given")
@@ -1,58 +1,169 @@
 import sys
-from lexer import tokenize
-from parser import parse
-from runtime import Runtime
-
-FIGLANG_HINTS = {
-    'saay':      'say',
-    'iff':       'if',
-    'iss':       'is',
-    'sayy':      'say',
-    'otherewise':'otherwise',
-    'otherwisse':'otherwise',
-    'repeet':    'repeat',
-    'tmes':      'times',
-    'timees':    'times',
-    'wheneever': 'whenever',
-    'untill':    'until',
-    'assk':      'ask',
-    'mor than':  'is above',
-    'more than': 'is above',
-    'less than': 'is below',
-    'greater than': 'is above',
-    'same as':   'is',
-    'equals':    'is',
-    'equal to':  'is',
-    'otherwise if': 'but if',
-    'else if':   'but if',
-    'else':      'otherwise',
-    'elif':      'but if',
-    'print':     'say',
-    'echo':      'say',
-    'input':     'ask',
-    'var':       'just write: name is value',
-    'let':       'just write: name is value',
-    'const':     'just write: name is value',
-    'def ':      'zone called',
-    'function':  'zone called',
-    'return':    'give back',
-    'while':     'until',
-    'for ':      'for each',
-    'foreach':   'for each',
-}
-
-def suggest(source):
-    suggestions = []
-    lines = source.split('\n')
-    for i, line in enumerate(lines, 1):
-        stripped = line.strip().lower()
-        for wrong, correct in FIGLANG_HINTS.items():
-            if wrong in stripped:
-                suggestions.append(
-                    f"  line {i}: did you mean '{correct}' "
-                    f"instead of '{wrong}'?"
-                )
-    return suggestions
+
+USAGE = """Usage: python fig.py [options] yourfile.fig
+
+Options:
+  --flush WHEN     when buffered file writes reach the disk:
+                   exit (default), N (every N lines) or Ns (every N seconds)
+  --quiet-files    do not print the [file] status lines
+  --unbuffered     print every line of output as soon as it is produced
+  --output FILE    write the program output to FILE instead of the screen
+  --log-file FILE  also stream every log entry to FILE in the background
+  --log-rotate N   compress FILE to FILE.1.gz before it passes N bytes
+                   (default 1048576)
+  --log-keep N     how many compressed log files to keep (default 5)
+  --log-buffer N   how many log entries to keep in memory (default 10000)
+  --event-loop     run "after" blocks on timers while the script goes on;
+                   the program ends when the last timer has fired
+  --virtual-time   do not really sleep: wait, after, timers, measure time
+                   and current time all follow a simulated clock
+  --workers N      processes used by "for each ... in parallel"
+                   (default: one per CPU)
+  --memo-size N    results kept by each "remembered" zone (default 1000)
+  --cache-size N   bytes kept in the cache for "cached" zones
+                   (default 67108864)
+  --no-cache       run "cached" zones every time
+  --serve          start a server that keeps the interpreter loaded
+  --client         run the script through the server (or locally if
+                   no server is running)
+  --socket PATH    socket used by --serve and --client
+  --warnings       check the script for likely mistakes before running it
+                   (they are always shown when the script stops on an error)
+  --hints FILE     extra "wrong -> right" hints shown after a syntax error
+  --startup-profile
+                   show how long each step and import takes before the
+                   first statement runs
+  --profile        time every line, zone and whenever rule and show where
+                   the time goes; also writes stacks for flame graph tools
+  --profile-file FILE
+                   where --profile writes the stacks
+                   (default figlang-profile.folded)
+  --sample         sample what the script is doing while it runs and show
+                   the busiest lines and zones (cheap enough for long runs)
+  --sample-interval MS
+                   CPU milliseconds between two samples (default 5)
+  --metrics FILE   write the run's counters (statements, assignments, rules,
+                   file bytes, sleep time...) to FILE as JSON
+  --prometheus FILE
+                   write the same counters in Prometheus text format
+  --memory-report  show which variables, groups, tables, maps, logs and
+                   snapshots hold the most memory when the script ends
+  --memory-limit SIZE
+                   warn when a single variable holds more than SIZE
+                   (like 500000, 64kb or 10mb)
+  --max-time S     stop the script with an error after S seconds
+  --max-steps N    stop it after N statements (rules and zones included)
+  --max-memory SIZE
+                   stop it when variables, histories and collections hold
+                   more than SIZE
+  --max-until N    rounds after which an "until" loop gives up
+                   (default 10000, 0 for no limit)
+  --batch TARGET   run every .fig file in a folder (or matching a glob)
+                   on a pool of worker processes; job.in, if present,
+                   answers the questions asked by job.fig
+  --jobs N         worker processes for --batch (default: one per CPU)
+  --report FILE    JSON report written by --batch
+                   (default figlang-batch.json)"""
+
+# opzioni che vogliono un valore: --flush 100
+VALUE_OPTIONS = ('--flush', '--output', '--log-file', '--log-rotate',
+                 '--log-keep', '--log-buffer', '--workers', '--memo-size',
+                 '--cache-size', '--socket', '--batch', '--jobs', '--report',
+                 '--hints', '--profile-file', '--sample-interval',
+                 '--metrics', '--prometheus', '--memory-limit',
+                 '--max-time', '--max-steps', '--max-memory', '--max-until')
+
+def parse_args(args):
+    filename, opts = None, {}
+    i = 0
+    while i < len(args):
+        a = args[i]
+        if a in VALUE_OPTIONS:
+            if i + 1 >= len(args):
+                raise ValueError(f"option '{a}' needs a value")
+            opts[a[2:]] = args[i + 1]
+            i += 2
+            continue
+        if a.startswith('--'): opts[a[2:]] = True
+        elif filename is None: filename = a
+        i += 1
+    return filename, opts
+
+def configure(runtime, opts):
+    from output_fig import Output
+    from logs_fig import LogBuffer, FileSink
+    from scheduler_fig import Scheduler, VirtualClock
+    flush = opts.get('flush', 'exit')
+    try:
+        if flush.endswith('s'):
+            runtime.files.flush_interval = float(flush[:-1])
+        elif flush != 'exit':
+            runtime.files.flush_lines = int(flush)
+    except ValueError:
+        raise ValueError(f"invalid value for --flush: '{flush}'")
+    if opts.get('quiet-files'):
+        runtime.file_messages = False
+    if opts.get('unbuffered') or opts.get('output'):
+        try:
+            runtime.out = Output(opts.get('output'), bool(opts.get('unbuffered')))
+        except OSError as e:
+            raise ValueError(f"cannot write output to '{opts['output']}': {e.strerror}")
+    try:
+        capacity = int(opts.get('log-buffer', 10000))
+        rotate = int(opts.get('log-rotate', 1 << 20))
+        keep = int(opts.get('log-keep', 5))
+    except ValueError:
+        raise ValueError('--log-buffer, --log-rotate and --log-keep need a number')
+    sink = None
+    if opts.get('log-file'):
+        try:
+            sink = FileSink(opts['log-file'], rotate, keep)
+        except OSError as e:
+            raise ValueError(f"cannot write logs to '{opts['log-file']}': {e.strerror}")
+    runtime.logs = LogBuffer(capacity, sink)
+    if opts.get('workers'):
+        try:
+            runtime.parallel_workers = int(opts['workers'])
+        except ValueError:
+            raise ValueError('--workers needs a number')
+    if opts.get('memo-size'):
+        try:
+            runtime.memo_size = int(opts['memo-size'])
+        except ValueError:
+            raise ValueError('--memo-size needs a number')
+    if opts.get('cache-size'):
+        try:
+            runtime.cache_size = int(opts['cache-size'])
+        except ValueError:
+            raise ValueError('--cache-size needs a number')
+    if opts.get('no-cache'):
+        runtime.cache_enabled = False
+    try:
+        if opts.get('max-until'): runtime.max_until = int(opts['max-until'])
+        max_time = float(opts['max-time']) if opts.get('max-time') else None
+        max_steps = int(opts['max-steps']) if opts.get('max-steps') else None
+    except ValueError:
+        raise ValueError('--max-time, --max-steps and --max-until need a number')
+    max_memory = None
+    if opts.get('max-memory'):
+        from memory_fig import parse_size
+        try:
+            max_memory = parse_size(opts['max-memory'])
+        except ValueError:
+            raise ValueError('--max-memory needs a size like 500000, 64kb or 10mb')
+    if max_time or max_steps or max_memory:
+        runtime.govern(max_time, max_steps, max_memory)
+    if opts.get('memory-limit'):
+        from memory_fig import MemoryGuard, parse_size
+        try:
+            limit = parse_size(opts['memory-limit'])
+        except ValueError:
+            raise ValueError('--memory-limit needs a size like 500000, 64kb or 10mb')
+        runtime.add_hooks(MemoryGuard(runtime, limit), ('assign',))
+    if opts.get('virtual-time'):
+        runtime.clock = VirtualClock()
+    if opts.get('event-loop'):
+        runtime.scheduler = Scheduler(runtime.clock)
 
 def format_error(kind, msg, line=None):
     print()
@@ -64,35 +175,139 @@ def format_error(kind, msg, line=None):
     print('=' * 50)
     print()
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python fig.py yourfile.fig")
+def show_hints(source, path=None):
+    # solo dopo un errore: sul percorso normale non si costruisce niente
+    from hints_fig import suggest
+    try:
+        hints = suggest(source, [path] if path else ())
+    except (OSError, ValueError) as e:
+        print(f'  (hints not available: {e})')
+        return
+    if hints:
+        print('  Hints:')
+        for h in hints: print(h)
+
+def show_warnings(ast, source):
+    try:
+        from warnings_fig import analyze
+        warns = analyze(ast, source)
+    except Exception:
         return
+    if warns:
+        print()
+        for w in warns:
+            print(f'  [!] {w}')
+        print()
 
-    filename = sys.argv[1]
+def write_metrics(metrics, opts):
+    for option, export in (('metrics', metrics.to_json), ('prometheus', metrics.to_prometheus)):
+        if not opts.get(option): continue
+        try:
+            with open(opts[option], 'w') as f: f.write(export())
+        except OSError as e:
+            print(f"[metrics] cannot write '{opts[option]}': {e.strerror}", file=sys.stderr)
+
+def report_memory(runtime):
+    from memory_fig import report
+    print('[memory] largest items when the script ended', file=sys.stderr)
+    for line in report(runtime): print(line, file=sys.stderr)
+
+def report_profile(prof, source, path):
+    prof.phase('execute')
+    prof.report(source)
+    try:
+        prof.write_collapsed(path)
+        print(f"[profile] stacks for flame graphs written to '{path}'", file=sys.stderr)
+    except OSError as e:
+        print(f"[profile] cannot write '{path}': {e.strerror}", file=sys.stderr)
+
+def without(args, options):
+    # gli argomenti senza le opzioni date (e i loro valori)
+    out, skip = [], False
+    for a in args:
+        if skip: skip = False
+        elif a in options: skip = a in VALUE_OPTIONS
+        else: out.append(a)
+    return out
+
+def main(args=None):
+    if args is None: args = sys.argv[1:]
+    try:
+        filename, opts = parse_args(args)
+    except ValueError as e:
+        format_error('Error', str(e))
+        return 1
+    if opts.get('serve'):
+        from serve_fig import serve
+        try:
+            serve(opts.get('socket'), main)
+        except (ValueError, OSError) as e:
+            format_error('Error', str(e))
+            return 1
+        return
+    if opts.get('batch'):
+        from batch_fig import run_batch
+        try:
+            jobs = int(opts['jobs']) if opts.get('jobs') else None
+        except ValueError:
+            format_error('Error', '--jobs needs a number')
+            return 1
+        try:
+            return run_batch(opts['batch'], jobs, main,
+                             without(args, ('--batch', '--jobs', '--report')),
+                             opts.get('report', 'figlang-batch.json'))
+        except (ValueError, OSError) as e:
+            format_error('Error', str(e))
+            return 1
+    if opts.get('client') and filename is not None:
+        from serve_fig import request
+        code = request(opts.get('socket'), without(args, ('--client', '--socket')))
+        if code is not None: sys.exit(code)
+    if filename is None:
+        print(USAGE)
+        return
+
+    startup = prof = None
+    if opts.get('startup-profile'):
+        from startup_fig import StartupProfile
+        startup = StartupProfile()
+    if opts.get('profile'):
+        from profile_fig import Profile
+        prof = Profile(filename.replace(';', '_'))
+    marks = [p.phase for p in (startup, prof) if p]
+    def step(name):
+        for mark in marks: mark(name)
+
+    # l'interprete si carica solo qui: il client del server non ne ha bisogno
+    from lexer import tokenize
+    from parser import parse, PARSED, remember_ast
+    from runtime import Runtime
+    from governor_fig import LimitExceeded
+    from metrics_fig import asks_for_counts
+    step('load interpreter')
 
     try:
         with open(filename, 'r') as f:
             source = f.read()
     except FileNotFoundError:
         format_error('Error', f"file '{filename}' not found")
-        return
-
-    # controlla suggerimenti sulla sintassi
-    hints = suggest(source)
+        return 1
+    step('read script')
 
+    ast = PARSED.get(source)
     try:
-        tokens = tokenize(source)
+        if ast is None: tokens = tokenize(source)
     except SyntaxError as e:
         msg = str(e)
         format_error('Syntax Error', msg)
-        if hints:
-            print('  Hints:')
-            for h in hints: print(h)
-        return
+        show_hints(source, opts.get('hints'))
+        return 1
+    step('tokenize')
 
     try:
-        ast = parse(tokens)
+        if ast is None:
+            ast = parse(tokens)
+            remember_ast(source, ast)
     except SyntaxError as e:
         msg = str(e)
         # estrai il numero di linea dal messaggio
@@ -102,27 +317,60 @@ def main():
                 line = msg.split('line')[-1].strip().split()[0]
             except: pass
         format_error('Syntax Error', msg, line)
-        if hints:
-            print('  Hints:')
-            for h in hints: print(h)
-        return
-
-    runtime = Runtime()
+        show_hints(source, opts.get('hints'))
+        return 1
+    step('parse')
 
-        # warnings
+    if prof:
+        from profile_fig import ProfiledRuntime
+        runtime = ProfiledRuntime(prof)
+    else:
+        runtime = Runtime()
     try:
-        from warnings_fig import analyze
-        warns = analyze(ast, source)
-        if warns:
-            print()
-            for w in warns:
-                print(f'  [!] {w}')
-            print()
-    except Exception:
-        pass
+        configure(runtime, opts)
+    except ValueError as e:
+        format_error('Error', str(e))
+        return 1
+    step('configure')
+
+    # l'analisi costa: si fa solo se richiesta, oppure dopo un errore
+    if opts.get('warnings'):
+        show_warnings(ast, source)
+        step('analysis')
+    if startup: startup.report()
+    # istruzioni e assegnamenti si contano solo se servono
+    if opts.get('metrics') or opts.get('prometheus') or asks_for_counts(ast):
+        runtime.metrics.start()
+
+    sampler = None
+    if opts.get('sample'):
+        from sample_fig import Sampler
+        try:
+            interval = float(opts.get('sample-interval', 5)) / 1000
+        except ValueError:
+            format_error('Error', '--sample-interval needs a number')
+            return 1
+        sampler = Sampler(runtime, interval)
+        try:
+            sampler.start()
+        except OSError as e:
+            format_error('Error', str(e))
+            return 1
 
     try:
-        runtime.run(ast)
+        # l'output in sospeso va scritto prima di un eventuale errore
+        try:
+            runtime.run(ast)
+            runtime.finish()
+        finally:
+            runtime.close()
+            if sampler:
+                sampler.stop()
+                sampler.report(source)
+            write_metrics(runtime.metrics, opts)
+            if opts.get('memory-report'): report_memory(runtime)
+            if prof: report_profile(prof, source, opts.get('profile-file', 'figlang-profile.folded'))
+        return 0
     except NameError as e:
         msg = str(e)
         format_error('Error', msg)
@@ -142,8 +390,14 @@ def main():
         format_error('File Error', str(e))
     except ZeroDivisionError:
         format_error('Math Error', 'cannot divide by zero')
+    except LimitExceeded as e:
+        format_error('Limit Error', str(e))
     except RecursionError:
-        format_error('Loop Error', 'infinite loop detected')
+        # le zone non usano lo stack di Python: qui ci arrivano solo le
+        # regole che si innescano a vicenda o espressioni annidatissime
+        format_error('Recursion Error',
+            'nesting is too deep\n'
+            '  a whenever, every or react rule may keep triggering itself')
     except TypeError as e:
         msg = str(e)
         if 'str' in msg and 'int' in msg:
@@ -154,5 +408,8 @@ def main():
             format_error('Type Error', msg)
     except Exception as e:
         format_error('Error', str(e))
+    if not opts.get('warnings'): show_warnings(ast, source)
+    return 1
 
-main()
\ No newline at end of file
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,178 @@
+import mmap
+import os
+import struct
+import time
+from array import array
+
+# sidecar: magic, dimensione e mtime del file indicizzato, poi gli offset
+INDEX_MAGIC = b'FIGIDX1\x00'
+INDEX_HEADER = struct.Struct('<8sQQ')
+
+
+class MappedFile:
+    def __init__(self, path):
+        self.path = path
+        st = os.stat(path)
+        self.size = st.st_size
+        self.mtime = st.st_mtime_ns
+        self._file = open(path, 'rb')
+        self._map = None
+        if self.size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._offsets = None
+
+    def is_stale(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        return st.st_size != self.size or st.st_mtime_ns != self.mtime
+
+    def close(self):
+        if self._map is not None: self._map.close()
+        self._file.close()
+
+    # ─── INDEX ─────────────────────────────────────────
+    def sidecar_path(self):
+        folder, base = os.path.split(os.path.abspath(self.path))
+        return os.path.join(folder, f'.{base}.figidx')
+
+    def offsets(self):
+        if self._offsets is None:
+            self._offsets = self._load_index()
+            if self._offsets is None:
+                self._offsets = self._build_index()
+                self._save_index()
+        return self._offsets
+
+    def _build_index(self):
+        offsets = array('Q')
+        if self._map is None:
+            return offsets
+        m, find, add = self._map, self._map.find, offsets.append
+        add(0)
+        pos = find(b'\n')
+        while pos != -1:
+            add(pos + 1)
+            pos = find(b'\n', pos + 1)
+        # niente riga vuota finale dopo l'ultimo newline
+        if offsets[-1] == self.size:
+            offsets.pop()
+        return offsets
+
+    def _load_index(self):
+        try:
+            with open(self.sidecar_path(), 'rb') as f:
+                magic, size, mtime = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+                if (magic, size, mtime) != (INDEX_MAGIC, self.size, self.mtime):
+                    return None
+                offsets = array('Q')
+                offsets.frombytes(f.read())
+                return offsets
+        except (OSError, struct.error, ValueError):
+            return None
+
+    def _save_index(self):
+        try:
+            with open(self.sidecar_path(), 'wb') as f:
+                f.write(INDEX_HEADER.pack(INDEX_MAGIC, self.size, self.mtime))
+                self._offsets.tofile(f)
+        except OSError:
+            pass
+
+    # ─── ACCESS ────────────────────────────────────────
+    def __len__(self):
+        return len(self.offsets())
+
+    def _span(self, start, end):
+        offs = self.offsets()
+        return offs[start], offs[end] if end < len(offs) else self.size
+
+    def line(self, n):
+        # n parte da 1, come row/column nelle tabelle
+        if not 1 <= n <= len(self):
+            return ''
+        a, b = self._span(n - 1, n)
+        return self._map[a:b].decode().rstrip('\r\n')
+
+    def lines(self, first, last):
+        first, last = max(first, 1), min(last, len(self))
+        if first > last:
+            return []
+        # decodifica solo la porzione richiesta, non tutto il file
+        a, b = self._span(first - 1, last)
+        text = self._map[a:b].decode()
+        if text.endswith('\n'): text = text[:-1]
+        return [l.rstrip('\r') for l in text.split('\n')]
+
+
+class _Handle:
+    __slots__ = ('file', 'pending', 'lines', 'last_flush')
+
+    def __init__(self, file, now):
+        self.file = file
+        self.pending = []
+        self.lines = 0
+        self.last_flush = now
+
+
+class FilePool:
+    # flush_lines / flush_interval a None: si scrive solo all'uscita,
+    # quando un file viene letto o quando il pool deve liberare un handle
+    def __init__(self, flush_lines=None, flush_interval=None, max_open=64):
+        self.flush_lines = flush_lines
+        self.flush_interval = flush_interval
+        self.max_open = max_open
+        self.handles = {}
+
+    def write(self, path, text):
+        path = os.path.abspath(path)
+        # la troncatura rende inutile quello che era ancora in attesa
+        self._close(path, discard=True)
+        self._queue(self._open(path, 'w'), text)
+
+    def append(self, path, text):
+        path = os.path.abspath(path)
+        h = self.handles.get(path)
+        if h is None: h = self._open(path, 'a')
+        self._queue(h, text)
+
+    def flush(self, path=None):
+        if path is None:
+            for h in self.handles.values(): self._flush(h)
+            return
+        h = self.handles.get(os.path.abspath(path))
+        if h is not None: self._flush(h)
+
+    def close(self):
+        for path in list(self.handles): self._close(path)
+
+    def _open(self, path, mode):
+        if len(self.handles) >= self.max_open:
+            self._close(next(iter(self.handles)))
+        h = _Handle(open(path, mode), time.monotonic())
+        self.handles[path] = h
+        return h
+
+    def _queue(self, h, text):
+        h.pending.append(text)
+        h.lines += 1
+        if self.flush_lines and h.lines >= self.flush_lines:
+            self._flush(h)
+        elif self.flush_interval is not None:
+            if time.monotonic() - h.last_flush >= self.flush_interval:
+                self._flush(h)
+
+    def _flush(self, h):
+        if h.pending:
+            h.file.write(''.join(h.pending))
+            h.pending.clear()
+        h.file.flush()
+        h.lines = 0
+        h.last_flush = time.monotonic()
+
+    def _close(self, path, discard=False):
+        h = self.handles.pop(path, None)
+        if h is None: return
+        if not discard: self._flush(h)
+        h.file.close()
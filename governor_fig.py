@@ -0,0 +1,67 @@
+import time
+
+from memory_fig import measure, size_text
+
+# ogni quante istruzioni si guardano l'orologio e la memoria
+CHECK_EVERY = 1024
+
+
+class LimitExceeded(BaseException):
+    # BaseException: "try to" non deve poter ignorare un limite
+    pass
+
+
+class Governor:
+    # limiti di tempo, di istruzioni e di memoria per un'esecuzione; si
+    # iscrive a on_statement e fa i controlli costosi solo ogni tanto
+    def __init__(self, runtime, max_time=None, max_steps=None, max_memory=None,
+                 deadline=None, steps=0):
+        self.runtime = runtime
+        self.max_time = max_time
+        self.max_steps = max_steps
+        self.max_memory = max_memory
+        # deadline e steps arrivano già avviati quando il Governor continua
+        # quello di un altro processo (share)
+        self.steps = steps
+        if deadline is None and max_time: deadline = time.monotonic() + max_time
+        self.deadline = deadline
+        self.next_check = self._next(CHECK_EVERY)
+        self.next_memory = CHECK_EVERY
+
+    def share(self):
+        # i limiti e il consumo fin qui, da passare a un processo worker
+        return {'max_time': self.max_time, 'max_steps': self.max_steps,
+                'max_memory': self.max_memory, 'deadline': self.deadline,
+                'steps': self.steps}
+
+    def charge(self, steps):
+        # istruzioni eseguite altrove (worker, zone together) per conto di questa esecuzione
+        self.steps += steps
+        self.check()
+
+    def _next(self, interval):
+        target = self.steps + interval
+        return min(target, self.max_steps) if self.max_steps else target
+
+    def on_statement(self, stmt):
+        self.steps += 1
+        if self.steps >= self.next_check: self.check()
+
+    def check(self):
+        # on_statement arriva prima dell'istruzione: la numero max_steps può ancora girare
+        if self.max_steps and self.steps > self.max_steps:
+            raise LimitExceeded(f"FigLang: the program ran more than {self.max_steps} statements")
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise LimitExceeded(f"FigLang: the program ran for more than {self.max_time:g} seconds")
+        if self.max_memory and self.steps >= self.next_memory:
+            rows = measure(self.runtime)
+            held = sum(r[2] for r in rows)
+            if held > self.max_memory:
+                name = rows[0][1]
+                raise LimitExceeded(f"FigLang: the program holds {size_text(held)}, more than "
+                                    f"{size_text(self.max_memory)} (the largest is '{name}')")
+            # misurare costa quanto i valori tenuti: il prossimo controllo
+            # aspetta almeno altrettante istruzioni
+            entries = sum(r[3] or 1 for r in rows)
+            self.next_memory = self.steps + max(CHECK_EVERY, entries)
+        self.next_check = self._next(CHECK_EVERY)
@@ -0,0 +1,142 @@
+from bisect import bisect_right
+from collections import deque
+
+FIGLANG_HINTS = {
+    'saay':      'say',
+    'iff':       'if',
+    'iss':       'is',
+    'sayy':      'say',
+    'otherewise':'otherwise',
+    'otherwisse':'otherwise',
+    'repeet':    'repeat',
+    'tmes':      'times',
+    'timees':    'times',
+    'wheneever': 'whenever',
+    'untill':    'until',
+    'assk':      'ask',
+    'mor than':  'is above',
+    'more than': 'is above',
+    'less than': 'is below',
+    'greater than': 'is above',
+    'same as':   'is',
+    'equals':    'is',
+    'equal to':  'is',
+    'otherwise if': 'but if',
+    'else if':   'but if',
+    'else':      'otherwise',
+    'elif':      'but if',
+    'print':     'say',
+    'echo':      'say',
+    'input':     'ask',
+    'var':       'just write: name is value',
+    'let':       'just write: name is value',
+    'const':     'just write: name is value',
+    'def':       'zone called',
+    'function':  'zone called',
+    'return':    'give back',
+    'while':     'until',
+    'for':       'for each',
+    'foreach':   'for each',
+}
+
+
+def _word(ch):
+    return ch.isalnum() or ch == '_'
+
+
+class HintScanner:
+    # automa di Aho-Corasick su tutte le parole sbagliate: una sola passata
+    # sul sorgente, qualunque sia la grandezza del dizionario
+    def __init__(self, hints):
+        self.hints = [(w.strip().lower(), c) for w, c in hints.items() if w.strip()]
+        self.goto = [{}]
+        self.fail = [0]
+        self.found = [()]
+        for index, (wrong, _) in enumerate(self.hints):
+            state = 0
+            for ch in wrong:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({}); self.fail.append(0); self.found.append(())
+                state = nxt
+            self.found[state] += (index,)
+        # collegamenti di fallimento in ampiezza: ogni stato eredita le
+        # parole finite nel suo suffisso più lungo
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                back = self.fail[state]
+                while back and ch not in self.goto[back]: back = self.fail[back]
+                target = self.goto[back].get(ch, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.found[nxt] += self.found[self.fail[nxt]]
+
+    def matches(self, text):
+        # (inizio, fine, indice) delle parole intere trovate in text
+        goto, fail, found = self.goto, self.fail, self.found
+        state = 0
+        for end, ch in enumerate(text, 1):
+            while state and ch not in goto[state]: state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index in found[state]:
+                start = end - len(self.hints[index][0])
+                if start > 0 and _word(text[start - 1]): continue
+                if end < len(text) and _word(text[end]): continue
+                yield start, end, index
+
+    def scan(self, source):
+        text = source.lower()
+        starts = [0] + [i + 1 for i, ch in enumerate(text) if ch == '\n']
+        # a parità di posizione vince la parola più lunga ("else if" su
+        # "else"); una forma già corretta ("for each") non è un errore
+        best = {}
+        for start, end, index in self.matches(text):
+            wrong, correct = self.hints[index]
+            after = start + len(correct)
+            if text.startswith(correct, start) and not (after < len(text) and _word(text[after])):
+                continue
+            if start not in best or end > best[start][0]:
+                best[start] = (end, index)
+        result, covered = [], -1
+        for start in sorted(best):
+            end, index = best[start]
+            if end <= covered: continue
+            covered = end
+            result.append((bisect_right(starts, start), *self.hints[index]))
+        return result
+
+
+_scanners = {}
+
+
+def scanner(extra=()):
+    # l'automa si costruisce solo quando serve, una volta per dizionario
+    key = tuple(extra)
+    if key not in _scanners:
+        hints = dict(FIGLANG_HINTS)
+        for path in extra: hints.update(load_hints(path))
+        _scanners[key] = HintScanner(hints)
+    return _scanners[key]
+
+
+def load_hints(path):
+    # una regola per riga: "wrong -> right"; le righe con # sono commenti
+    hints = {}
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'): continue
+            wrong, arrow, correct = line.partition('->')
+            if not arrow or not wrong.strip() or not correct.strip():
+                raise ValueError(f"hint file '{path}' line {number}: expected 'wrong -> right'")
+            hints[wrong.strip()] = correct.strip()
+    return hints
+
+
+def suggest(source, extra=()):
+    return [f"  line {line}: did you mean '{correct}' instead of '{wrong}'?"
+            for line, wrong, correct in scanner(extra).scan(source)]
@@ -0,0 +1,56 @@
+# eventi a cui ci si può iscrivere con runtime.add_hooks(obj): obj
+# definisce i metodi on_<evento> che gli interessano
+#   on_statement(stmt)            prima di ogni istruzione
+#   on_assign(name, old, value)   dopo "name is ..." (old None se nuova)
+#   on_rule_fired(kind, rule)     whenever / every / react che scatta
+#   on_zone_enter(name, args)     all'ingresso in una zona
+#   on_zone_exit(name)            all'uscita, anche con un errore
+#   on_io(kind, detail)           say, ask, read, write, append
+HOOK_EVENTS = ('statement', 'assign', 'rule_fired', 'zone_enter', 'zone_exit', 'io')
+
+
+class Tracer:
+    # "debug on" e "watch": le loro stampe passano dagli eventi come
+    # quelle di qualsiasi altro strumento
+    def __init__(self, runtime):
+        self.runtime = runtime
+
+    def on_statement(self, stmt):
+        self.runtime.out.line(f"  [debug] {stmt[0]}")
+
+    def on_assign(self, name, old, value):
+        rt = self.runtime
+        if rt.debug_mode:
+            rt.out.line(f"  [assign] {name} = {value}")
+        if name in rt.watchers and old is not None and old != value:
+            rt.out.line(f"  [watch] {name} changed: {old} -> {value}")
+
+
+# ─── I/O TAPS ──────────────────────────────────────────
+# messi davanti a out e input solo finché qualcuno ascolta on_io; le
+# operazioni sui file, rare, controllano direttamente gli iscritti
+class OutTap:
+    def __init__(self, out, hooks):
+        self.out = out
+        self.hooks = hooks
+
+    def line(self, text=''):
+        for fn in self.hooks: fn('say', text)
+        self.out.line(text)
+
+    def flush(self):
+        self.out.flush()
+
+    def close(self):
+        self.out.close()
+
+
+class InputTap:
+    def __init__(self, input, hooks):
+        self.input = input
+        self.hooks = hooks
+
+    def __call__(self, prompt=''):
+        for fn in self.hooks: fn('ask', prompt)
+        return self.input(prompt)
+
@@ -5,7 +5,7 @@ TOKENS = [
     ('COMMENT',     r'--[^\n]*'),
 
     # Spazi e newline
-    ('NEWLINE',     r'\n'),
+    ('NEWLINE',     r'\n[ \t]*'),
     ('SKIP',        r'[ \t]+'),
 
     # Frecce
@@ -27,6 +27,7 @@ TOKENS = [
     ('MEASURED',    r'\bmeasured in\b'),
     ('OWNED',       r'\bowned by\b'),
     ('MEASURE',     r'\bmeasure time\b'),
+    ('BENCHMARK',   r'\bbenchmark\b'),
     ('ELAPSED',     r'\belapsed time\b'),
     ('STATE',       r'\bcan be\b'),
     ('STARTS_AS',   r'\bstarts as\b'),
@@ -284,7 +285,8 @@ def tokenize(source):
 
                 if token_type == 'NEWLINE':
                     line += 1
-                    tokens.append(('NEWLINE', '\n', line))
+                    # il valore tiene il rientro della riga successiva
+                    tokens.append(('NEWLINE', value, line))
                 elif token_type == 'COMMENT':
                     pass
                 elif token_type == 'SKIP':
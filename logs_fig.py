@@ -0,0 +1,119 @@
+import os
+import time
+from collections import deque
+
+LEVELS = {'info': 0, 'warning': 1, 'error': 2}
+PREFIXES = {'info': '', 'warning': 'WARNING: ', 'error': 'ERROR: '}
+
+# i record tengono solo il tempo monotonic: l'ora di sistema si ricava
+# da questo scarto quando il record viene stampato o scritto
+_WALL_OFFSET = time.time() - time.monotonic()
+_last_stamp = (None, '')
+
+
+def render(record):
+    global _last_stamp
+    ts, level, msg = record
+    second = int(_WALL_OFFSET + ts)
+    cached, stamp = _last_stamp
+    if cached != second:
+        from datetime import datetime
+        stamp = datetime.fromtimestamp(second).strftime('%Y-%m-%d %H:%M:%S')
+        _last_stamp = (second, stamp)
+    return f"[{stamp}] {PREFIXES.get(level, '')}{msg}"
+
+
+class LogBuffer:
+    def __init__(self, capacity=10000, sink=None):
+        self.records = deque(maxlen=capacity)
+        self.sink = sink
+        self.total = 0
+
+    def add(self, level, msg):
+        record = (time.monotonic(), level, msg)
+        self.append(record)
+        return record
+
+    def append(self, record):
+        self.records.append(record)
+        self.total += 1
+        if self.sink is not None: self.sink.put(record)
+
+    def select(self, level='info'):
+        least = LEVELS.get(level, 0)
+        return [r for r in self.records if LEVELS.get(r[1], 0) >= least]
+
+    def __len__(self):
+        return len(self.records)
+
+    def close(self):
+        if self.sink is not None:
+            self.sink.close()
+            self.sink = None
+
+
+class FileSink:
+    # scrive i record da un thread in background; quando il file sta per
+    # superare max_bytes viene compresso in file.1.gz e i vecchi scalano di uno
+    def __init__(self, path, max_bytes=1 << 20, backups=5, interval=0.5):
+        import threading
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.interval = interval
+        self.pending = []
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopping = False
+        self.file = open(path, 'a')
+        self.size = self.file.tell()
+        self.thread = threading.Thread(target=self._loop, name='figlang-log', daemon=True)
+        self.thread.start()
+
+    def put(self, record):
+        with self.lock:
+            self.pending.append(record)
+
+    def close(self):
+        self.stopping = True
+        self.wake.set()
+        self.thread.join()
+        self.file.close()
+
+    def _loop(self):
+        while True:
+            self.wake.wait(self.interval)
+            self._drain()
+            if self.stopping:
+                return
+
+    def _drain(self):
+        with self.lock:
+            batch, self.pending = self.pending, []
+        # una scrittura sola per batch, spezzata dove il record dopo
+        # farebbe superare max_bytes; sfora solo un record più grande del limite
+        chunk = []
+        for r in batch:
+            text = render(r) + '\n'
+            size = len(text.encode())
+            if self.max_bytes and self.size and self.size + size > self.max_bytes:
+                self.file.write(''.join(chunk))
+                chunk = []
+                self._rotate()
+            chunk.append(text)
+            self.size += size
+        self.file.write(''.join(chunk))
+        self.file.flush()
+
+    def _rotate(self):
+        self.file.close()
+        for i in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{i}.gz"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{i + 1}.gz")
+        if self.backups:
+            import gzip, shutil
+            with open(self.path, 'rb') as src, gzip.open(f"{self.path}.1.gz", 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+        self.file = open(self.path, 'w')
+        self.size = 0
@@ -0,0 +1,96 @@
+import sys
+import time
+from collections import deque
+
+UNITS = {'': 1, 'b': 1, 'k': 1 << 10, 'kb': 1 << 10, 'm': 1 << 20, 'mb': 1 << 20,
+         'g': 1 << 30, 'gb': 1 << 30}
+
+
+def deep_size(obj):
+    # byte tenuti in vita da obj: ogni oggetto si conta una volta sola, così
+    # una storia che ripete lo stesso valore non pesa più del dovuto
+    seen, size, todo = set(), 0, [obj]
+    while todo:
+        o = todo.pop()
+        if id(o) in seen: continue
+        seen.add(id(o))
+        size += sys.getsizeof(o)
+        if isinstance(o, dict):
+            todo.extend(o.keys()); todo.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset, deque)):
+            todo.extend(o)
+    return size
+
+
+def variable_size(var):
+    return deep_size((var.value, var.history, var.limits, var.annotations))
+
+
+def measure(runtime):
+    # (tipo, nome, byte, voci di storia, cambi al secondo), i più grandi prima
+    rt = runtime
+    uptime = max(time.monotonic() - rt.metrics.started, 1e-9)
+    rows = []
+    for name, var in rt.variables.items():
+        n = len(var.history)
+        rows.append(('variable', name, variable_size(var), n, (n - 1) / uptime))
+    for kind, items in (('group', {k: g['items'] for k, g in rt.groups.items()}),
+                        ('table', rt.tables), ('map', rt.maps), ('snapshot', rt.snapshots)):
+        for name, value in items.items():
+            rows.append((kind, name, deep_size(value), None, None))
+    if len(rt.logs):
+        rows.append(('logs', 'logs', deep_size(rt.logs.records), None, None))
+    rows.sort(key=lambda r: -r[2])
+    return rows
+
+
+def report(runtime, limit=15):
+    rows = measure(runtime)
+    total = sum(r[2] for r in rows)
+    lines = [f"  {len(rows)} item(s), {size_text(total)} in total"]
+    for kind, name, size, entries, rate in rows[:limit]:
+        line = f"  {kind:<9}{name[:22]:<23}{size_text(size):>10}"
+        if entries is not None:
+            line += f"{entries:>8} entries{rate:>10.1f} changes/s"
+        lines.append(line)
+    if len(rows) > limit: lines.append(f"  ... {len(rows) - limit} more")
+    return lines
+
+
+class MemoryGuard:
+    # limite morbido per variabile: si misura solo quando la storia raddoppia
+    # di lunghezza, quindi il costo per assegnamento resta costante
+    def __init__(self, runtime, limit):
+        self.runtime = runtime
+        self.limit = limit
+        self.warned = set()
+
+    def on_assign(self, name, old, value):
+        var = self.runtime.variables.get(name)
+        if var is None or name in self.warned: return
+        n = len(var.history)
+        if n & (n - 1): return
+        size = variable_size(var)
+        if size > self.limit:
+            self.warned.add(name)
+            print(f"[memory] warning: '{name}' holds {size_text(size)} "
+                  f"({n} history entries), over the {size_text(self.limit)} limit",
+                  file=sys.stderr)
+
+
+def parse_size(text):
+    # "500000", "64kb", "10 MB"
+    text = text.strip().lower()
+    number = text.rstrip('kmgb ')
+    unit = text[len(number):].strip()
+    if unit not in UNITS: raise ValueError(f"invalid size: '{text}'")
+    return int(float(number) * UNITS[unit])
+
+
+def size_text(n):
+    if n < 1024: return f"{n} B"
+    for unit in ('KiB', 'MiB'):
+        n /= 1024
+        if n < 1024: return f"{n:.1f} {unit}"
+    n /= 1024
+    return f"{n:.1f} GiB"
@@ -0,0 +1,99 @@
+import time
+
+# nome -> (descrizione, tipo prometheus); i contatori "counted" arrivano
+# dagli eventi, quindi solo dopo start(); gli altri sono sempre aggiornati
+METRICS = {
+    'statements':           ('statements executed', 'counter'),
+    'assignments':          ('assignments made', 'counter'),
+    'whenever_evaluations': ('whenever conditions checked', 'counter'),
+    'whenever_firings':     ('whenever rules that fired', 'counter'),
+    'every_triggers':       ('every rules that fired', 'counter'),
+    'react_triggers':       ('react rules that fired', 'counter'),
+    'file_bytes_read':      ('bytes read from files', 'counter'),
+    'file_bytes_written':   ('bytes written or appended to files', 'counter'),
+    'sleep_seconds':        ('seconds spent in wait and after', 'counter'),
+    'history_entries':      ('values kept in variable histories', 'gauge'),
+    'variables':            ('variables defined', 'gauge'),
+    'uptime_seconds':       ('seconds since the program started', 'gauge'),
+}
+COUNTED = ('statements', 'assignments', 'whenever_evaluations',
+           'whenever_firings', 'every_triggers', 'react_triggers')
+RULE_COUNTERS = {'whenever': 'whenever_firings', 'every': 'every_triggers',
+                 'react': 'react_triggers'}
+
+
+def asks_for_counts(ast):
+    # c'è un "explain performance", anche dentro un blocco o una zona?
+    # Allora istruzioni e assegnamenti vanno contati fin dall'inizio
+    todo = [ast]
+    while todo:
+        node = todo.pop()
+        if isinstance(node, tuple) and node[:2] == ('explain', 'performance'): return True
+        todo.extend(n for n in node if isinstance(n, (list, tuple)))
+    return False
+
+
+class Metrics:
+    # registro del runtime: i sottosistemi rari (file, attese) sommano
+    # direttamente, istruzioni e assegnamenti si contano con gli hook solo
+    # se qualcuno ha chiesto le metriche
+    def __init__(self, runtime):
+        self.runtime = runtime
+        self.counters = dict.fromkeys(('file_bytes_read', 'file_bytes_written') + COUNTED, 0)
+        self.slept = runtime.clock.slept
+        self.started = time.monotonic()
+        self.counting = False
+
+    def add(self, name, amount=1):
+        self.counters[name] += amount
+
+    def start(self):
+        if self.counting: return
+        self.counting = True
+        self.runtime.add_hooks(self, ('statement', 'assign', 'rule_fired'))
+
+    def on_statement(self, stmt):
+        self.counters['statements'] += 1
+
+    def on_assign(self, name, old, value):
+        self.counters['assignments'] += 1
+        # dopo ogni assegnamento si ricontrollano tutte le condizioni
+        self.counters['whenever_evaluations'] += len(self.runtime.whenevers)
+
+    def on_rule_fired(self, kind, rule):
+        self.counters[RULE_COUNTERS[kind]] += 1
+
+    def values(self):
+        rt = self.runtime
+        values = dict(self.counters)
+        values['sleep_seconds'] = round(rt.clock.slept - self.slept, 6)
+        values['history_entries'] = sum(len(v.history) for v in rt.variables.values())
+        values['variables'] = len(rt.variables)
+        values['uptime_seconds'] = round(time.monotonic() - self.started, 6)
+        return {name: values[name] for name in METRICS}
+
+    # ─── EXPORT ────────────────────────────────────────
+    def to_json(self):
+        import json
+        return json.dumps({'counting': self.counting, 'metrics': self.values()}, indent=2) + '\n'
+
+    def to_prometheus(self):
+        lines = []
+        for name, value in self.values().items():
+            if not self.counting and name in COUNTED: continue
+            help_text, kind = METRICS[name]
+            metric = f"figlang_{name}" + ('_total' if kind == 'counter' else '')
+            lines.append(f"# HELP {metric} {help_text[0].upper()}{help_text[1:]}.")
+            lines.append(f"# TYPE {metric} {kind}")
+            lines.append(f"{metric} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def report(self):
+        lines = [f"\n── explain: performance ──────────────"]
+        for name, value in self.values().items():
+            if not self.counting and name in COUNTED: continue
+            lines.append(f"  {METRICS[name][0]:<36}: {value}")
+        if not self.counting:
+            lines.append("  (statements, assignments and rules are counted from here on)")
+        lines.append("────────────────────────────────────\n")
+        return lines
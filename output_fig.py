@@ -0,0 +1,42 @@
+import sys
+
+
+class Output:
+    # raccoglie le righe e le scrive a blocchi; unbuffered=True torna a
+    # un print per riga come prima
+    def __init__(self, path=None, unbuffered=False, buffer_size=1 << 16):
+        self.unbuffered = unbuffered
+        self.buffer_size = buffer_size
+        self.parts = []
+        self.size = 0
+        self.file = open(path, 'w', buffering=buffer_size) if path else None
+
+    def line(self, text=''):
+        if self.unbuffered:
+            if self.file is None:
+                print(text)
+            else:
+                self.file.write(text + '\n'); self.file.flush()
+            return
+        self.parts.append(text)
+        self.size += len(text) + 1
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        # sys.stdout letto qui, così un redirect fatto dopo vale ancora
+        stream = self.file if self.file is not None else sys.stdout
+        data = '\n'.join(self.parts) + '\n' if self.parts else ''
+        self.parts.clear()
+        self.size = 0
+        try:
+            if data: stream.write(data)
+            stream.flush()
+        except BrokenPipeError:
+            pass
+
+    def close(self):
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,46 @@
+import glob
+import importlib.util
+import marshal
+import os
+import sys
+import zipfile
+
+# un unico file eseguibile con i moduli già compilati: all'avvio non si
+# legge né si compila nessun sorgente, anche senza __pycache__ scrivibile
+
+LAUNCHER = "import sys\nfrom fig import main\nsys.exit(main())\n"
+
+
+def modules(folder):
+    found = [os.path.join(folder, n) for n in ('fig.py', 'lexer.py', 'parser.py', 'runtime.py')]
+    found += sorted(p for p in glob.glob(os.path.join(folder, '*_fig.py'))
+                    if os.path.basename(p) not in ('pack_fig.py', 'bench_fig.py'))
+    return found
+
+
+def compiled(path):
+    with open(path, 'rb') as f:
+        source = f.read()
+    code = compile(source, os.path.basename(path), 'exec', dont_inherit=True)
+    # pyc "unchecked hash": valido anche senza il sorgente accanto
+    return (importlib.util.MAGIC_NUMBER + (1).to_bytes(4, 'little')
+            + importlib.util.source_hash(source) + marshal.dumps(code))
+
+
+def pack(target='figlang.pyz', folder=None):
+    folder = folder or os.path.dirname(os.path.abspath(__file__))
+    # i .pyc vanno bene solo per questa versione di Python
+    shebang = f"#!/usr/bin/env python{sys.version_info[0]}.{sys.version_info[1]}\n"
+    with open(target, 'wb') as f:
+        f.write(shebang.encode())
+        with zipfile.ZipFile(f, 'w', zipfile.ZIP_STORED) as z:
+            z.writestr('__main__.py', LAUNCHER)
+            for path in modules(folder):
+                name = os.path.basename(path)[:-3] + '.pyc'
+                z.writestr(name, compiled(path))
+    os.chmod(target, 0o755)
+    return target
+
+
+if __name__ == '__main__':
+    print(f"written {pack(*sys.argv[1:2])}")
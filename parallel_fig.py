@@ -0,0 +1,297 @@
+import copy
+import multiprocessing
+import os
+import time
+
+from files_fig import FilePool
+from governor_fig import LimitExceeded
+from runtime import Runtime, Variable
+
+# sotto questa soglia il costo dei processi supera il guadagno
+PARALLEL_MIN_ITEMS = 64
+
+# istruzioni che un worker sa eseguire o registrare come effetto da
+# riprodurre nel processo principale, nello stesso ordine
+PARALLEL_SAFE = {
+    'assign', 'say', 'say_transform', 'say_context', 'if', 'given',
+    'repeat', 'count', 'for_each', 'until', 'log', 'append_file',
+    'add_to_group', 'expr', 'check', 'validate', 'show_list', 'show_bar',
+    'show_sorted', 'compare_vals', 'clamp', 'chain',
+}
+RANDOM_EXPRS = {'random_between', 'random_from', 'random_bool', 'shuffled'}
+
+
+# ─── ANALYSIS ──────────────────────────────────────────
+def blockers(runtime, var, body):
+    # ritorna i motivi per cui il corpo non può girare in parallelo;
+    # lista vuota = si può
+    reasons = []
+    assigned = set()
+    for stmt in walk_statements(body):
+        kind = stmt[0]
+        if kind not in PARALLEL_SAFE:
+            reasons.append(f"'{kind}' cannot run in parallel")
+        elif kind in ('assign', 'clamp', 'chain'):
+            assigned.add(stmt[1])
+        elif kind == 'add_to_group':
+            assigned.add(stmt[2])
+        elif kind in ('count', 'for_each'):
+            assigned.add('it')
+            if kind == 'for_each': assigned.add(stmt[1])
+    if _contains(body, RANDOM_EXPRS):
+        reasons.append('random values depend on the order of the items')
+    if _contains(body, {'call_zone'}):
+        reasons.append('zone calls cannot run in parallel')
+
+    # un valore letto prima di essere scritto nello stesso giro arriva
+    # dal giro precedente: dipendenza fra item
+    defined = {var, 'it'}
+    for stmt in body:
+        carried = (names(stmt) & assigned) - defined
+        if carried:
+            reasons.append(f"'{sorted(carried)[0]}' carries a value from one item to the next")
+        if stmt[0] == 'assign':
+            defined.add(stmt[1])
+
+    # questi reagiscono a ogni assegnamento nel processo principale
+    if runtime.whenevers or runtime.everys or runtime.reactions:
+        if assigned: reasons.append('whenever/every/react rules watch the assignments')
+    for name in assigned:
+        if name in runtime.watchers or name in runtime.requires:
+            reasons.append(f"'{name}' is watched or has requirements")
+    if runtime.debug_mode:
+        reasons.append('debug mode is on')
+    return reasons
+
+
+def walk_statements(body):
+    for stmt in body:
+        if not stmt: continue
+        yield stmt
+        kind = stmt[0]
+        if kind == 'if':
+            yield from walk_statements(stmt[2])
+            for _, eb in stmt[3]: yield from walk_statements(eb)
+            yield from walk_statements(stmt[4])
+        elif kind in ('given', 'repeat', 'until'):
+            yield from walk_statements(stmt[2])
+        elif kind in ('count', 'for_each'):
+            yield from walk_statements(stmt[3])
+
+
+def names(node):
+    # tutti i nomi che un nodo può leggere (approssimati per eccesso)
+    found = set()
+    _collect_names(node, found)
+    return found
+
+
+def _collect_names(node, found):
+    if isinstance(node, list):
+        for n in node: _collect_names(n, found)
+        return
+    if not isinstance(node, tuple) or not node:
+        return
+    if node[0] == 'string':
+        return
+    if node[0] == 'assign':
+        _collect_names(node[2], found); return
+    if node[0] == 'add_to_group':
+        _collect_names(node[1], found); return
+    for part in node[1:]:
+        if isinstance(part, str): found.add(part)
+        else: _collect_names(part, found)
+
+
+def _contains(node, kinds):
+    if isinstance(node, list):
+        return any(_contains(n, kinds) for n in node)
+    if isinstance(node, tuple) and node:
+        if node[0] in kinds: return True
+        return any(_contains(n, kinds) for n in node[1:])
+    return False
+
+
+# ─── PARENT SIDE ───────────────────────────────────────
+def run_parallel(runtime, var, items, body):
+    pool = runtime.process_pool()
+    workers = runtime.parallel_workers
+    env = _environment(runtime, body)
+    size = max(1, len(items) // (workers * 4))
+    chunks = [(body, var, items[i:i + size], env)
+              for i in range(0, len(items), size)]
+    final = {}
+    # map restituisce i risultati nell'ordine dei chunk: gli effetti
+    # vengono riprodotti come se il ciclo fosse stato sequenziale
+    for effects, written, steps, error in pool.map(_run_chunk, chunks):
+        replay(runtime, effects)
+        final.update(written)
+        if error is not None:
+            raise error
+        if runtime.governor is not None: runtime.governor.charge(steps)
+    # la history tiene solo il valore finale, non quello di ogni item
+    for name, value in final.items():
+        if name in runtime.variables: runtime.variables[name].set(value)
+        else: runtime.variables[name] = Variable(value)
+
+
+def replay(runtime, effects):
+    for effect in effects:
+        kind = effect[0]
+        if kind == 'say':      runtime.out.line(effect[1])
+        elif kind == 'log':    runtime.logs.append(effect[1])
+        elif kind == 'append': runtime.files.append(effect[1], effect[2])
+        elif kind == 'group':  runtime.add_to_group(effect[1], effect[2])
+
+
+def _environment(runtime, body):
+    used = names(body)
+    pick = lambda d: {k: v for k, v in d.items() if k in used}
+    return {
+        'variables': {k: v.value for k, v in runtime.variables.items() if k in used},
+        'maps': pick(runtime.maps), 'tables': pick(runtime.tables),
+        'states': pick(runtime.state_current),
+        'file_messages': runtime.file_messages,
+        'max_until': runtime.max_until,
+        # ogni worker continua i limiti del padre da dove sono arrivati
+        'limits': runtime.governor.share() if runtime.governor is not None else None,
+    }
+
+
+# ─── WORKER SIDE ───────────────────────────────────────
+class _Capture:
+    def __init__(self, effects):
+        self.effects = effects
+
+    def line(self, text=''):
+        self.effects.append(('say', text))
+
+    def add(self, level, msg):
+        record = (time.monotonic(), level, msg)
+        self.effects.append(('log', record))
+        return record
+
+    def flush(self): pass
+
+    def close(self): pass
+
+
+class _WorkerRuntime(Runtime):
+    # esegue il corpo come il runtime normale, ma gli effetti visibili
+    # fuori dal ciclo vengono solo registrati
+    def __init__(self, env, effects):
+        super().__init__()
+        self.effects = effects
+        self.out = self.logs = _Capture(effects)
+        self.file_messages = env['file_messages']
+        self.maps, self.tables = env['maps'], env['tables']
+        self.state_current = env['states']
+        self.max_until = env['max_until']
+        if env['limits']: self.govern(**env['limits'])
+        for k, v in env['variables'].items():
+            self.variables[k] = Variable(v)
+
+    def add_to_group(self, group, item):
+        self.effects.append(('group', group, item))
+
+    def exec_append_file(self, stmt):
+        _, content_expr, fname_expr = stmt
+        content = self.to_string(self.evaluate(content_expr))
+        fname = self.to_string(self.evaluate(fname_expr))
+        self.effects.append(('append', fname, content + '\n'))
+        if self.file_messages: self.out.line(f"  [file] appended to '{fname}'")
+
+
+def _run_chunk(args):
+    body, var, items, env = args
+    effects = []
+    rt = _WorkerRuntime(env, effects)
+    start = dict(rt.variables)
+    error = None
+    try:
+        rt.for_each_items(var, items, body)
+    except BaseException as e:
+        # anche LimitExceeded e Ctrl-C tornano al padre, che li rilancia
+        error = e
+    written = {k: v.value for k, v in rt.variables.items()
+               if v is not start.get(k) or len(v.history) > 1}
+    steps = rt.governor.steps - env['limits']['steps'] if env['limits'] else 0
+    return effects, written, steps, error
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+# ─── ZONES TOGETHER ────────────────────────────────────
+# il runtime del processo principale al momento del fork: ogni figlio
+# ne riceve una copia e ci esegue una zona
+_forked = None
+
+
+def can_fork():
+    return 'fork' in multiprocessing.get_all_start_methods()
+
+
+def run_together(runtime, names):
+    global _forked
+    runtime.out.flush()
+    runtime.files.flush()
+    ctx = multiprocessing.get_context('fork')
+    _forked = runtime
+    try:
+        # maxtasksperchild=1: ogni zona parte da una copia pulita
+        with ctx.Pool(len(names), maxtasksperchild=1) as pool:
+            results = pool.map(_run_task, names, chunksize=1)
+    finally:
+        _forked = None
+
+    writers = {}
+    error = None
+    for name, (effects, written, maps, steps, task_error) in zip(names, results):
+        replay(runtime, effects)
+        if runtime.governor is not None and error is None and task_error is None:
+            try: runtime.governor.charge(steps)
+            except LimitExceeded as e: error = e
+        for var, value in written.items():
+            if var in writers and writers[var][1] != value:
+                runtime.out.line(f"  [together] '{var}' was written by both "
+                                 f"'{writers[var][0]}' and '{name}', keeping '{name}'")
+            writers[var] = (name, value)
+            if var in runtime.variables: runtime.variables[var].set(value)
+            else: runtime.variables[var] = Variable(value)
+            if var in runtime.groups: runtime.groups[var]['items'] = value
+        runtime.maps.update(maps)
+        if error is None: error = task_error
+    if error is not None:
+        raise error
+
+
+def _run_task(name):
+    rt = _forked
+    effects = []
+    rt.out = rt.logs = _Capture(effects)
+    # i file si scrivono direttamente dal figlio, con handle suoi
+    rt.files = FilePool()
+    rt._pool = rt._cache = None
+    before = {k: (v, len(v.history), copy.deepcopy(v.value))
+              for k, v in rt.variables.items()}
+    # il Governor è arrivato col fork e conta già: serve solo sapere quanto
+    start = rt.governor.steps if rt.governor is not None else 0
+    error = None
+    try:
+        rt.execute(('do_zone', name, False, []))
+    except BaseException as e:
+        # un'eccezione che esce dal task uccide il worker del Pool e il
+        # padre aspetterebbe per sempre: LimitExceeded, Ctrl-C ed exit
+        # tornano come risultato e il padre li rilancia
+        error = e
+    rt.files.close()
+    written = {}
+    for k, v in rt.variables.items():
+        old = before.get(k)
+        if old is None or v is not old[0] or len(v.history) != old[1] or v.value != old[2]:
+            written[k] = v.value
+    maps = {k: rt.maps[k] for k in written if k in rt.maps}
+    steps = rt.governor.steps - start if rt.governor is not None else 0
+    return effects, written, maps, steps, error
@@ -1,7 +1,24 @@
+class Node(tuple):
+    # un'istruzione che si ricorda la riga del sorgente da cui viene;
+    # per il resto è la tupla di sempre
+    def __new__(cls, items, line):
+        node = tuple.__new__(cls, items)
+        node.line = line
+        return node
+
+    def __reduce__(self):
+        return Node, (tuple(self), self.line)
+
+
 class Parser:
     def __init__(self, tokens):
         self.tokens = tokens
         self.pos = 0
+        # rientro di ogni riga, preso dal NEWLINE che la apre
+        self.indents = {t[2]: len(t[1][1:].expandtabs(4))
+                        for t in tokens if t[0] == 'NEWLINE'}
+        # (rientro, riga) delle istruzioni in corso di parsing
+        self.headers = []
 
     def peek(self, offset=0):
         p = self.pos + offset
@@ -23,12 +40,26 @@ class Parser:
     def skip_newlines(self):
         while self.current_type() == 'NEWLINE': self.eat()
 
+    def line_indent(self, line):
+        return self.indents.get(line, 0)
+
+    def in_block(self, header):
+        # il corpo va avanti finché le righe sono più rientrate
+        # dell'intestazione (o stanno sulla sua stessa riga)
+        indent, line = header
+        tok_line = self.current()[2]
+        return tok_line == line or self.line_indent(tok_line) > indent
+
     def parse_block(self):
         stmts = []
         self.skip_newlines()
         while self.current_type() != 'EOF':
             if self.current_type() == 'NEWLINE':
                 self.eat(); continue
+            if self.current_type() in ('BUT', 'OTHERWISE'):
+                tok = self.current()
+                raise SyntaxError(
+                    f"FigLang: '{tok[1]}' without a matching 'if' on line {tok[2]}")
             s = self.parse_statement()
             if s: stmts.append(s)
         return stmts
@@ -41,10 +72,12 @@ class Parser:
     def parse_indented_block(self):
         stmts = []
         self.skip_newlines()
+        header = self.headers[-1] if self.headers else (-1, None)
         stop = ('EOF', 'OTHERWISE', 'BUT')
         while self.current_type() not in stop:
             if self.current_type() == 'NEWLINE':
                 self.eat(); continue
+            if not self.in_block(header): break
             s = self.parse_statement()
             if s: stmts.append(s)
             else: break
@@ -68,6 +101,7 @@ class Parser:
             'RECALL': self.parse_recall, 'FORGET': self.parse_forget,
             'CHECK_THAT': self.parse_check, 'LISTEN_FOR': self.parse_listen,
             'MEASURE': self.parse_measure, 'WAIT': self.parse_wait,
+            'BENCHMARK': self.parse_benchmark,
             'ADD': self.parse_add_to_group,
             'READ': self.parse_read, 'WRITE': self.parse_write,
             'APPEND': self.parse_append, 'LINES_OF': self.parse_lines_of,
@@ -78,10 +112,18 @@ class Parser:
             'STOP_TIMER': self.parse_stop_timer,
             'COMPARE': self.parse_compare, 'ALIAS': self.parse_alias,
             'CLEAN': self.parse_chain_clean, 'CLAMP': self.parse_clamp,
+            'GIVE': self.parse_give_back,
             'IDENT': self.parse_ident_statement,
         }
         handler = dispatch.get(t)
-        if handler: return handler()
+        if handler:
+            line = self.current()[2]
+            self.headers.append((self.line_indent(line), line))
+            try:
+                node = handler()
+            finally:
+                self.headers.pop()
+            return Node(node, line) if type(node) is tuple else node
         if t in ('BUT', 'OTHERWISE'): return None
         if t == 'NEWLINE': self.eat(); return None
         self.eat(); return None
@@ -109,13 +151,17 @@ class Parser:
         self.eat('COLON'); self.skip_newlines()
         body = self.parse_indented_block()
         elifs, else_body = [], []
-        while self.current_type() == 'BUT':
+        # "but if" e "otherwise" valgono solo allo stesso rientro dell'if:
+        # più a sinistra appartengono a un if esterno
+        indent = self.headers[-1][0]
+        aligned = lambda: self.line_indent(self.current()[2]) == indent
+        while self.current_type() == 'BUT' and aligned():
             self.eat('BUT'); self.eat('IF')
             ec = self.parse_condition()
             self.eat('COLON'); self.skip_newlines()
             eb = self.parse_indented_block()
             elifs.append((ec, eb))
-        if self.current_type() == 'OTHERWISE':
+        if self.current_type() == 'OTHERWISE' and aligned():
             self.eat('OTHERWISE'); self.eat('COLON')
             self.skip_newlines()
             else_body = self.parse_indented_block()
@@ -157,8 +203,12 @@ class Parser:
         var = self.eat('IDENT')[1]
         self.eat('IN')
         col = self.parse_expression()
+        # for each x in items in parallel:
+        kind = 'for_each'
+        if self.current_type() == 'IN' and self.peek(1)[1] == 'parallel':
+            self.eat('IN'); self.eat('IDENT'); kind = 'parallel_for_each'
         self.eat('COLON'); self.skip_newlines()
-        return ('for_each', var, col, self.parse_indented_block())
+        return (kind, var, col, self.parse_indented_block())
 
     # ─── WHENEVER ──────────────────────────────────────
     def parse_whenever(self):
@@ -261,17 +311,67 @@ class Parser:
 
     # ─── ZONE ──────────────────────────────────────────
     def parse_zone_def(self):
+        # zone called fib with n remembered:
         self.eat('ZONE'); self.eat('CALLED')
         name = self.eat('IDENT')[1]
+        params = []
+        if self.current_type() == 'WITH':
+            self.eat('WITH'); params.append(self.eat('IDENT')[1])
+            while self.current_type() == 'COMMA':
+                self.eat('COMMA'); params.append(self.eat('IDENT')[1])
+        # modificatori: remembered, cached [for 10 minutes]
+        remembered, cached, ttl = False, False, None
+        while self.current_value() in ('remembered', 'cached'):
+            if self.eat('IDENT')[1] == 'remembered':
+                remembered = True; continue
+            cached = True
+            if self.current_type() == 'FOR':
+                self.eat('FOR'); ttl = self.parse_duration()
         self.eat('COLON'); self.skip_newlines()
-        return ('zone_def', name, self.parse_indented_block())
+        return ('zone_def', name, self.parse_indented_block(), params,
+                remembered, cached, ttl)
+
+    def parse_duration(self):
+        amount = float(self.eat('NUMBER')[1])
+        unit = self.current_type()
+        scale = {'SECONDS_U': 1, 'SECOND': 1, 'MINUTES': 60, 'HOURS': 3600}
+        if unit not in scale:
+            raise SyntaxError(
+                f"FigLang: expected seconds, minutes or hours on line {self.current()[2]}")
+        self.eat()
+        return amount * scale[unit]
+
+    def parse_zone_args(self):
+        args = []
+        if self.current_type() == 'WITH':
+            self.eat('WITH'); args.append(self.parse_expression())
+            while self.current_type() == 'COMMA':
+                self.eat('COMMA'); args.append(self.parse_expression())
+        return args
+
+    def parse_give_back(self):
+        self.eat('GIVE'); self.eat('BACK')
+        if self.current_type() in ('NEWLINE', 'EOF'): return ('give_back', None)
+        return ('give_back', self.parse_expression())
 
     def parse_do_zone(self):
         self.eat('DO')
         name = self.eat('IDENT')[1]
+        args = self.parse_zone_args()
+        # do A and B and C together
+        if self.current_type() == 'AND':
+            names = [name]
+            while self.current_type() == 'AND':
+                self.eat('AND'); names.append(self.eat('IDENT')[1])
+            if self.current_value() != 'together':
+                raise SyntaxError(
+                    f"FigLang: expected 'together' after zone names "
+                    f"on line {self.current()[2]}")
+            self.eat('IDENT')
+            return ('do_together', names)
         again = self.current_type() == 'AGAIN'
         if again: self.eat('AGAIN')
-        return ('do_zone', name, again)
+        return ('do_zone', name, again, args)
 
     # ─── ROLE ──────────────────────────────────────────
     def parse_role(self):
@@ -349,6 +449,20 @@ class Parser:
         self.eat('MEASURE'); self.eat('COLON'); self.skip_newlines()
         return ('measure_time', self.parse_indented_block())
 
+    # ─── BENCHMARK ─────────────────────────────────────
+    def parse_benchmark(self):
+        self.eat('BENCHMARK')
+        n = self.parse_expression()
+        self.eat('TIMES'); self.eat('COLON'); self.skip_newlines()
+        body = self.parse_indented_block()
+        # "against:" allo stesso rientro di benchmark, come otherwise
+        against = None
+        if (self.current_type() == 'IDENT' and self.current_value() == 'against'
+                and self.line_indent(self.current()[2]) == self.headers[-1][0]):
+            self.eat('IDENT'); self.eat('COLON'); self.skip_newlines()
+            against = self.parse_indented_block()
+        return ('benchmark', n, body, against)
+
     # ─── WAIT ──────────────────────────────────────────
     def parse_wait(self):
         self.eat('WAIT')
@@ -430,6 +544,9 @@ class Parser:
     def parse_log(self):
         self.eat('LOG')
         msg = self.parse_expression()
+        return ('log', msg, self.parse_log_level())
+
+    def parse_log_level(self):
         level = 'info'
         if self.current_type() == 'WITH':
             self.eat('WITH'); self.eat('LEVEL')
@@ -439,12 +556,14 @@ class Parser:
                 self.eat('ERROR_LVL'); level = 'error'
             elif self.current_type() == 'INFO':
                 self.eat('INFO'); level = 'info'
-        return ('log', msg, level)
+        return level
 
     # ─── SAVE LOGS ─────────────────────────────────────
     def parse_save_logs(self):
         self.eat('SAVE_LOGS')
-        return ('save_logs', self.parse_expression())
+        # save logs to "f" with level warning -> solo warning ed error
+        fname = self.parse_expression()
+        return ('save_logs', fname, self.parse_log_level())
 
     # ─── AFTER ─────────────────────────────────────────
     def parse_after(self):
@@ -763,7 +882,8 @@ class Parser:
                      'BYTES','KILOBYTES','MEGABYTES',
                      'SECONDS_U','MINUTES','HOURS',
                      'DEGREES','RADIANS')
-            if self.current_type() in units:
+            # "wait 5 seconds" non è una conversione: serve "in"
+            if self.current_type() in units and self.peek(1)[0] == 'IN':
                 uf = self.current_type().lower(); self.eat()
                 self.eat('IN')
                 ut = self.current_type().lower(); self.eat()
@@ -788,6 +908,15 @@ class Parser:
         elif t == 'LBRACKET':
             return self.parse_list()
 
+        elif t == 'LPAREN':
+            self.eat('LPAREN'); e = self.parse_expression(); self.eat('RPAREN')
+            return e
+
+        # zone che restituisce un valore: do fib with n - 1
+        elif t == 'DO':
+            self.eat('DO'); name = self.eat('IDENT')[1]
+            return ('call_zone', name, self.parse_zone_args())
+
         # Memory ops
         elif t == 'PREVIOUS':
             self.eat('PREVIOUS'); self.eat('VALUE'); self.eat('OF')
@@ -907,6 +1036,20 @@ class Parser:
         # Identifiers
         elif t == 'IDENT':
             name = self.eat('IDENT')[1]
+            # file access: line 5 of "f", line count of "f", lines 1 to 10 of "f"
+            if name == 'line' and self.current_type() == 'COUNT':
+                self.eat('COUNT'); self.eat('OF')
+                return ('file_line_count', self.parse_expression())
+            if name == 'line' and self._at_line_number():
+                n = self.parse_line_number()
+                self.eat('OF')
+                return ('file_line', n, self.parse_expression())
+            if name == 'lines' and self._at_line_number():
+                first = self.parse_line_number()
+                self.eat('TO')
+                last = self.parse_line_number()
+                self.eat('OF')
+                return ('file_lines', first, last, self.parse_expression())
             if self.current_type() == 'IN' and self.peek(1)[0] in ('UPPERCASE','LOWERCASE'):
                 self.eat('IN')
                 if self.current_type() == 'UPPERCASE':
@@ -933,6 +1076,16 @@ class Parser:
 
         return ('number', 0)
 
+    def _at_line_number(self):
+        t = self.current_type()
+        return t == 'NUMBER' or (t == 'IDENT' and self.peek(1)[0] in ('OF', 'TO'))
+
+    def parse_line_number(self):
+        # niente parse_primary: "n of path" diventerebbe un accesso a mappa
+        if self.current_type() == 'NUMBER':
+            return ('number', self.eat('NUMBER')[1])
+        return ('var', self.eat('IDENT')[1])
+
     def parse_list(self):
         self.eat('LBRACKET')
         items = []
@@ -944,4 +1097,24 @@ class Parser:
 
 
 def parse(tokens):
-    return Parser(tokens).parse_block()
\ No newline at end of file
+    return Parser(tokens).parse_block()
+
+
+# AST già costruiti, per testo sorgente: il daemon e "use" non rifanno
+# lexer e parser su file che non sono cambiati
+PARSED = {}
+PARSED_MAX = 256
+
+
+def remember_ast(source, ast):
+    if len(PARSED) >= PARSED_MAX: PARSED.pop(next(iter(PARSED)))
+    PARSED[source] = ast
+
+
+def parse_source(source):
+    ast = PARSED.get(source)
+    if ast is None:
+        from lexer import tokenize
+        ast = parse(tokenize(source))
+        remember_ast(source, ast)
+    return ast
\ No newline at end of file
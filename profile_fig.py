@@ -0,0 +1,134 @@
+import sys
+import time
+
+from runtime import Runtime
+
+# oltre questa profondità gli stack del flame graph non crescono più:
+# una ricorsione di migliaia di livelli darebbe righe enormi
+MAX_DEPTH = 256
+
+
+class Profile:
+    # tempo totale e proprio di ogni riga, zona e regola whenever, più gli
+    # stack per il flame graph; tutto misurato con entrate e uscite annidate
+    def __init__(self, name='script'):
+        self.phases = []
+        self.last = time.perf_counter()
+        self.stats = {}
+        self.active = {}
+        # trie dei percorsi: id -> (padre, etichetta), tempo proprio per id
+        self.paths = {}
+        self.nodes = [(None, name)]
+        self.own = [0.0]
+        self.frames = [[None, self.last, 0.0, 0]]
+
+    def phase(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def enter(self, key, label):
+        parent = self.frames[-1][3]
+        path = parent
+        if len(self.frames) <= MAX_DEPTH:
+            path = self.paths.get((parent, label))
+            if path is None:
+                path = self.paths[(parent, label)] = len(self.nodes)
+                self.nodes.append((parent, label))
+                self.own.append(0.0)
+        self.active[key] = self.active.get(key, 0) + 1
+        self.frames.append([key, time.perf_counter(), 0.0, path])
+
+    def leave(self):
+        key, start, children, path = self.frames.pop()
+        spent = time.perf_counter() - start
+        self.frames[-1][2] += spent
+        own = spent - children
+        self.own[path] += own
+        entry = self.stats.get(key)
+        if entry is None: entry = self.stats[key] = [0, 0.0, 0.0]
+        entry[0] += 1
+        entry[2] += own
+        # in una ricorsione il totale conta solo la chiamata più esterna
+        self.active[key] -= 1
+        if not self.active[key]: entry[1] += spent
+
+    # ─── OUTPUT ────────────────────────────────────────
+    def collapsed(self):
+        # formato "a;b;c microsecondi", quello di flamegraph.pl e speedscope
+        lines = []
+        for path, own in enumerate(self.own):
+            micros = int(own * 1e6)
+            if not micros: continue
+            labels = []
+            while path is not None:
+                parent, label = self.nodes[path]
+                labels.append(label)
+                path = parent
+            lines.append(f"{';'.join(reversed(labels))} {micros}")
+        return lines
+
+    def write_collapsed(self, path):
+        with open(path, 'w') as f:
+            for line in self.collapsed(): f.write(line + '\n')
+
+    def report(self, source='', out=sys.stderr, limit=20):
+        text = source.split('\n')
+        ms = lambda s: f"{s * 1000:10.2f}"
+        print('[profile] phases (ms)', file=out)
+        for name, spent in self.phases:
+            print(f"  {name:<30}{ms(spent)}", file=out)
+        for kind, title in (('line', 'lines'), ('zone', 'zones'), ('whenever', 'whenever rules')):
+            rows = [(key[1], v) for key, v in self.stats.items() if key[0] == kind]
+            if not rows: continue
+            rows.sort(key=lambda r: -r[1][2])
+            print(f"[profile] {title:<24}{'hits':>6}{'total ms':>10}{'self ms':>10}", file=out)
+            for what, (hits, total, own) in rows[:limit]:
+                if kind == 'zone':
+                    label = what
+                else:
+                    snippet = text[what - 1].strip() if what and what <= len(text) else ''
+                    label = f"{what or '?':>4}  {snippet[:22]}"
+                print(f"  {label:<28}{hits:>6}{ms(total)}{ms(own)}", file=out)
+
+
+class ProfiledRuntime(Runtime):
+    # il runtime normale resta senza misure: il profiler costa solo quando
+    # è richiesto
+    def __init__(self, profile):
+        self.profile = profile
+        self.rule_lines = {}
+        super().__init__()
+
+    def block(self, stmts):
+        prof = self.profile
+        for stmt in stmts:
+            if stmt is None: continue
+            line = getattr(stmt, 'line', None)
+            prof.enter(('line', line), f"line {line} {stmt[0]}")
+            try:
+                yield from Runtime.block(self, (stmt,))
+            finally:
+                prof.leave()
+
+    def zone(self, name, args):
+        self.profile.enter(('zone', name), f"zone {name}")
+        try:
+            return (yield from Runtime.zone(self, name, args))
+        finally:
+            self.profile.leave()
+
+    def exec_whenever_def(self, stmt):
+        super().exec_whenever_def(stmt)
+        self.rule_lines[id(stmt[2])] = getattr(stmt, 'line', None)
+
+    def check_whenevers(self):
+        for cond, body in self.whenevers:
+            line = self.rule_lines.get(id(body))
+            self.profile.enter(('whenever', line), f"whenever line {line}")
+            try:
+                if self.eval_condition(cond):
+                    if self.hooks['rule_fired']: self.fire('rule_fired', 'whenever', cond)
+                    for s in body: self.execute(s)
+            finally:
+                self.profile.leave()
@@ -0,0 +1,173 @@
+from parser import Node
+
+# un until fermo si riconosce dopo un solo giro: se il giro non ha cambiato
+# niente di quello da cui la condizione dipende, il giro dopo farà
+# esattamente lo stesso. Vale solo se nessuno aspetta qualcosa da fuori
+# (input, file, tempo, caso, zone)
+OUTSIDE_EXPRS = {
+    'random_between', 'random_from', 'random_bool', 'shuffled', 'timer_val',
+    'time_op', 'file_line', 'file_lines', 'file_line_count', 'call_zone',
+    'table_row', 'table_column', 'map_access', 'chance',
+}
+OUTSIDE_STATEMENTS = {
+    'ask', 'listen', 'wait', 'after', 'read_file', 'lines_of', 'recall',
+    'use', 'do_zone', 'do_together', 'parallel_for_each', 'start_timer',
+    'stop_timer', 'measure_time', 'benchmark', 'snapshot_restore',
+}
+OUTSIDE = OUTSIDE_EXPRS | OUTSIDE_STATEMENTS
+# leggono la storia, non solo il valore: riassegnare lo stesso valore conta
+HISTORY_EXPRS = {'memory', 'trend', 'changes'}
+# nei nodi di condizione le stringhe sono operatori e certezze, non nomi
+CONDITIONS = {
+    'compare', 'between', 'is_empty', 'not_empty', 'trend', 'changes', 'hits',
+    'contains', 'starts_with', 'is_valid', 'logical', 'expr_cond',
+}
+# un confronto "is maybe" o "is probably" tira a sorte: per _contains è
+# un nodo 'chance'
+CHANCES = {'maybe', 'probably'}
+SCALARS = (int, float, str, bool, type(None))
+# dove ogni istruzione scrive; quelle che non scrivono variabili sono in
+# NO_TARGET, tutte le altre potrebbero scrivere ovunque
+TARGET_AT = {
+    'assign': 1, 'add_to_group': 2, 'clamp': 1, 'chain': 1, 'set_limits': 1,
+    'annotate': 1, 'group_def': 1, 'map_def': 1, 'table_def': 1,
+    'state_def': 1, 'state_start': 1, 'state_become': 1, 'state_transition': 1,
+}
+NO_TARGET = {
+    'say', 'say_transform', 'say_context', 'log', 'show_list', 'show_bar',
+    'show_sorted', 'check', 'compare_vals', 'explain', 'validate', 'pipeline',
+    'write_file', 'append_file', 'save_logs', 'snapshot_take', 'expr',
+    'if', 'given', 'repeat', 'until', 'count', 'for_each', 'try',
+}
+
+def watched(stmt):
+    # corpo del until diviso in unità che si possono giudicare, o None se
+    # il giro non si può giudicare; calcolato una volta e tenuto sul nodo
+    try:
+        return stmt.watch
+    except AttributeError:
+        pass
+    _, cond, body = stmt
+    found = None
+    if not _contains([cond, body], OUTSIDE):
+        found = (_names(cond), [_unit(s) for s in body if s],
+                 _contains([cond, body], HISTORY_EXPRS))
+    if isinstance(stmt, Node): stmt.watch = found
+    return found
+
+
+def loop_watch(runtime, stmt):
+    # (nomi, storia, every): i nomi letti dalla condizione più quelli letti
+    # da ogni istruzione o regola che può scrivere uno di loro, fino a punto
+    # fisso; le regole già definite scattano dentro il giro
+    found = watched(stmt)
+    if found is None: return None
+    rt = runtime
+    names, units, history = found
+    if rt.whenevers or rt.everys or rt.reactions:
+        rules = [rt.whenevers, rt.everys, list(rt.reactions.values())]
+        if _contains(rules, OUTSIDE): return None
+        units = units + [_unit(body, reads) for reads, body in rt.whenevers]
+        units += [_unit(entry[2], ('var', entry[1]), id(entry)) for entry in rt.everys]
+        units += [_unit(body, [('var', d) for d in deps]) for deps, body in rt.reactions.values()]
+        history = history or _contains(rules, HISTORY_EXPRS)
+    relevant, counters, grown = set(names), [], True
+    while grown:
+        grown = False
+        for targets, reads, counter in units:
+            if (targets is None or targets & relevant) and not reads <= relevant:
+                relevant |= reads
+                grown = True
+            # un every che conta verso un'istruzione utile è stato anche lui
+            if counter is not None and counter not in counters and (targets is None or targets & relevant):
+                counters.append(counter)
+    return tuple(sorted(relevant)), history, tuple(counters)
+
+
+def _unit(node, extra=(), counter=None):
+    # (nomi scritti o None se non si sa, nomi letti, contatore dell'every)
+    return _targets(node), set(_names([node, extra])), counter
+
+
+def _targets(node):
+    found = set()
+    for stmt in _statements(node if isinstance(node, list) else [node]):
+        kind = stmt[0]
+        if kind in TARGET_AT: found.add(stmt[TARGET_AT[kind]])
+        elif kind == 'count': found.add('it')
+        elif kind == 'for_each': found.update((stmt[1], 'it'))
+        elif kind not in NO_TARGET: return None
+    return found
+
+
+def _statements(body):
+    for stmt in body:
+        if not stmt: continue
+        yield stmt
+        kind = stmt[0]
+        if kind == 'if':
+            yield from _statements(stmt[2])
+            for _, eb in stmt[3]: yield from _statements(eb)
+            yield from _statements(stmt[4])
+        elif kind in ('given', 'repeat', 'until'):
+            yield from _statements(stmt[2])
+        elif kind in ('count', 'for_each'):
+            yield from _statements(stmt[3])
+        elif kind == 'try':
+            yield from _statements([stmt[1], stmt[2]])
+
+
+def fingerprint(runtime, names, history, counters):
+    # numeri di versione, non hash profondi: la variabile stessa (un nuovo
+    # oggetto se è stata ricreata) e il valore se semplice, altrimenti
+    # quante volte è cambiata e, per le liste che crescono sul posto come
+    # i gruppi, la lunghezza
+    variables, states = runtime.variables, runtime.state_current
+    prints = []
+    for name in names:
+        var = variables.get(name)
+        if var is None:
+            prints.append(states.get(name))
+            continue
+        value = var.value
+        if not history and isinstance(value, SCALARS):
+            prints.append((var, value))
+        elif type(value) is list:
+            prints.append((var, len(var.history), len(value)))
+        else:
+            prints.append((var, len(var.history)))
+    # un every conta gli assegnamenti: prima o poi può scattare
+    for key in counters: prints.append(runtime.every_counters.get(key))
+    return prints
+
+
+def _names(node):
+    found = set()
+    _collect_names(node, found)
+    return tuple(sorted(n for n in found if n.isidentifier()))
+
+
+def _collect_names(node, found):
+    # per eccesso: un nome in più rende solo il controllo più prudente;
+    # una tupla che non comincia con il tipo (una regola) vale come lista
+    if isinstance(node, list) or (isinstance(node, tuple) and node and not isinstance(node[0], str)):
+        for n in node: _collect_names(n, found)
+        return
+    if not isinstance(node, tuple) or not node or node[0] == 'string':
+        return
+    condition = node[0] in CONDITIONS
+    for part in node[1:]:
+        if isinstance(part, str):
+            if not condition: found.add(part)
+        else: _collect_names(part, found)
+
+
+def _contains(node, kinds):
+    if isinstance(node, list) or (isinstance(node, tuple) and node and not isinstance(node[0], str)):
+        return any(_contains(n, kinds) for n in node)
+    if isinstance(node, tuple) and node:
+        kind = node[0]
+        if kind == 'compare' and node[4] in CHANCES: kind = 'chance'
+        if kind in kinds: return True
+        return any(_contains(n, kinds) for n in node[1:])
+    return False
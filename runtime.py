@@ -1,9 +1,25 @@
-import time
-import json
 import os
 import re
-import random
-from datetime import datetime
+import time
+from collections import OrderedDict
+from output_fig import Output
+from logs_fig import LogBuffer, render
+from scheduler_fig import Clock
+from hooks_fig import HOOK_EVENTS, Tracer, OutTap, InputTap
+from metrics_fig import Metrics, asks_for_counts
+from parser import Node
+
+
+# random e json servono a pochi script e costano qualche millisecondo
+# all'avvio: si caricano al primo uso
+def _random():
+    import random
+    return random
+
+
+def _json():
+    import json
+    return json
 
 
 class Variable:
@@ -45,60 +61,125 @@ class Variable:
         return len(self.history) >= 2 and self.history[-1] < self.history[-2]
 
 
-class Runtime:
-    def __init__(self):
-        self.variables = {}
-        self.zones = {}
-        self.roles = {}
-        self.whenevers = []
-        self.every_counters = {}
-        self.everys = []
-        self.watchers = set()
-        self.requires = {}
-        self.states = {}
-        self.state_transitions = {}
-        self.state_current = {}
-        self.reactions = {}
-        self.snapshots = {}
-        self.groups = {}
-        self.tables = {}
-        self.maps = {}
-        self.aliases = {}
-        self.logs = []
-        self.debug_mode = False
-        self.timer_start = None
-        self.timer_value = 0
-        self.elapsed = 0
+class Frame:
+    # una chiamata di zona con parametri: i nomi che non c'erano all'entrata
+    # sono locali e spariscono all'uscita, quelli nascosti tornano al loro posto
+    __slots__ = ('known', 'saved', 'scope')
 
-    def run(self, statements):
-        for s in statements:
-            self.execute(s)
+    def __init__(self, known, saved, scope):
+        self.known = known
+        self.saved = saved
+        self.scope = scope
 
-    def execute(self, stmt):
-        if stmt is None: return
-        kind = stmt[0]
-        if self.debug_mode: print(f"  [debug] {kind}")
 
-        # Check alias first
-        if kind == 'call_method' and stmt[2] in self.aliases:
-            for s in self.aliases[stmt[2]]:
-                self.execute(s)
-            return
+class _GiveBack(BaseException):
+    # BaseException: "try to" non deve intercettarla
+    def __init__(self, value):
+        self.value = value
+
+
+class _Again(BaseException):
+    # "do X again" dentro X: si riparte dall'inizio della zona
+    def __init__(self, args):
+        self.args_ = args
+
+
+class _NeedCall(BaseException):
+    # un'espressione chiama una zona: il driver la esegue sul suo stack
+    # e poi rivaluta l'istruzione con il risultato al posto at
+    def __init__(self, name, args, at, end):
+        self.name = name
+        self.args_ = args
+        self.at = at
+        self.end = end
+
+
+def _has_calls(stmt):
+    # l'istruzione chiama zone dalle sue espressioni? I corpi (Node) non
+    # contano: le loro istruzioni passano dal driver per conto loro
+    calls = getattr(stmt, 'calls', None)
+    if calls is None:
+        calls = _find_call(stmt[1:])
+        if isinstance(stmt, Node): stmt.calls = calls
+    return calls
+
+
+def _find_call(parts):
+    for part in parts:
+        if isinstance(part, Node) or not isinstance(part, (tuple, list)): continue
+        if (part and part[0] == 'call_zone') or _find_call(part): return True
+    return False
+
+
+def find_library(path, base=''):
+    search_paths = [
+        path,
+        os.path.join('libs', path),
+        os.path.join(os.path.dirname(path), 'libs', path),
+    ]
+    for p in search_paths:
+        if os.path.exists(os.path.join(base, p)):
+            return p
+    return None
+
+
+def _memo_key(value):
+    if isinstance(value, (list, tuple)): return tuple(_memo_key(v) for v in value)
+    if isinstance(value, dict): return tuple(sorted((k, _memo_key(v)) for k, v in value.items()))
+    return value
+
+
+def timing_stats(times):
+    # nanosecondi -> mappa in millisecondi; p95 col metodo del rango più vicino
+    ms = sorted(t / 1e6 for t in times)
+    n = len(ms)
+    mean = sum(ms) / n
+    median = ms[n // 2] if n % 2 else (ms[n // 2 - 1] + ms[n // 2]) / 2
+    stddev = (sum((t - mean) ** 2 for t in ms) / (n - 1)) ** 0.5 if n > 1 else 0.0
+    stats = {'runs': n, 'min': ms[0], 'median': median, 'mean': mean,
+             'p95': ms[-(-95 * n // 100) - 1], 'stddev': stddev}
+    return {k: v if k == 'runs' else round(v, 4) for k, v in stats.items()}
 
-        dispatch = {
+
+class Runtime:
+    def __init__(self):
+        # configurazione e risorse: restano uguali fra un reset e l'altro
+        self.memo_size = 1000
+        self.cache_enabled = True
+        self.cache_size = 64 << 20
+        self._cache = None
+        self.logs = LogBuffer()
+        self.mapped_files = {}
+        from files_fig import FilePool
+        self.files = FilePool()
+        self.file_messages = True
+        self.out = Output()
+        self.input = input
+        self.scheduler = None
+        self.clock = Clock()
+        self.parallel_workers = None
+        self._pool = None
+        # giri oltre i quali un until si arrende (0: nessun limite)
+        self.max_until = 10000
+        # il Governor dei limiti --max-*, se c'è
+        self.governor = None
+        # iscritti agli eventi: configurazione, restano anche dopo reset()
+        self.hooks = {event: [] for event in HOOK_EVENTS}
+        self.tracer = Tracer(self)
+        self.metrics = None
+        self.dispatch = {
             'assign': self.exec_assign, 'say': self.exec_say,
             'say_transform': self.exec_say_transform,
             'say_context': self.exec_say_context,
-            'ask': self.exec_ask, 'if': self.exec_if,
-            'until': self.exec_until, 'given': self.exec_given,
-            'repeat': self.exec_repeat, 'count': self.exec_count,
-            'for_each': self.exec_for_each,
+            'ask': self.exec_ask,
+            'parallel_for_each': self.exec_parallel_for_each,
             'whenever': self.exec_whenever_def,
             'every': self.exec_every_def,
             'assume': self.exec_assume, 'require': self.exec_require,
             'set_limits': self.exec_set_limits,
-            'pipeline': self.exec_pipeline, 'try': self.exec_try,
-            'zone_def': self.exec_zone_def, 'do_zone': self.exec_do_zone,
+            'zone_def': self.exec_zone_def,
+            'do_together': self.exec_do_together,
+            'give_back': self.exec_give_back,
             'role_def': self.exec_role_def,
             'watch': self.exec_watch, 'unwatch': self.exec_unwatch,
             'explain': self.exec_explain, 'debug': self.exec_debug,
@@ -140,22 +221,290 @@ class Runtime:
             'clamp': self.exec_clamp,
             'expr': lambda s: self.evaluate(s[1]),
         }
-        h = dispatch.get(kind)
-        if h: h(stmt)
+        # istruzioni con un corpo: generatori eseguiti dal driver
+        self.flow = {
+            'if': self.exec_if, 'until': self.exec_until,
+            'given': self.exec_given, 'repeat': self.exec_repeat,
+            'count': self.exec_count, 'for_each': self.exec_for_each,
+            'try': self.exec_try, 'do_zone': self.exec_do_zone,
+            'benchmark': self.exec_benchmark, 'pipeline': self.exec_pipeline,
+        }
+        self.plain_dispatch, self.plain_flow = self.dispatch, self.flow
+        self.reset()
+
+    def reset(self):
+        # stato del programma: contenitori nuovi, senza svuotare i vecchi
+        self.variables = {}
+        self.zones = {}
+        self.zone_params = {}
+        self.memos = {}
+        self.scope = None
+        self.zone_calls = []
+        self.cached_zones = {}
+        # insiemi dei file letti, uno per ogni zona cached in esecuzione
+        self.read_paths = []
+        self.roles = {}
+        self.whenevers = []
+        self.every_counters = {}
+        self.everys = []
+        self.watchers = set()
+        self.requires = {}
+        self.states = {}
+        self.state_transitions = {}
+        self.state_current = {}
+        self.reactions = {}
+        self.snapshots = {}
+        self.groups = {}
+        self.tables = {}
+        self.maps = {}
+        self.aliases = {}
+        self.debug_mode = False
+        self.timer_start = None
+        self.timer_value = 0
+        self.elapsed = 0
+        # stack esplicito dei blocchi e delle zone in esecuzione
+        self._stack = []
+        self._replay = None
+        if self.metrics is not None: self.remove_hooks(self.metrics)
+        self.metrics = Metrics(self)
+        self.trace()
+
+    def run(self, statements):
+        self.drive(statements)
+
+    def finish(self):
+        # in modalità event loop il programma finisce con l'ultimo timer
+        if self.scheduler is not None:
+            self.scheduler.drain(self)
+
+    def process_pool(self):
+        if self._pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            from parallel_fig import default_workers
+            if not self.parallel_workers:
+                self.parallel_workers = default_workers()
+            self._pool = ProcessPoolExecutor(self.parallel_workers)
+        return self._pool
+
+    def zone_cache(self):
+        if self._cache is None:
+            from cache_fig import open_cache
+            self._cache = open_cache(self.cache_size)
+            if self._cache is None: self.cache_enabled = False
+        return self._cache
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._cache is not None:
+            self._cache.close()
+            self._cache = None
+        self.out.close()
+        self.logs.close()
+        self.files.close()
+        for mf in self.mapped_files.values(): mf.close()
+        self.mapped_files.clear()
+
+    def execute(self, stmt):
+        if stmt is None: return
+        # esecuzione annidata (whenever, alias...): i suoi risultati di zona
+        # non sono quelli dell'istruzione in corso
+        replay, self._replay = self._replay, None
+        recorded = self.__dict__.pop('evaluate', None)
+        try:
+            self.drive([stmt])
+        finally:
+            self._replay = replay
+            if recorded is not None: self.evaluate = recorded
+
+    # ─── DRIVER ────────────────────────────────────────
+    # i blocchi e le zone sono generatori su self._stack: un generatore
+    # cede una lista di istruzioni o un altro generatore da eseguire e
+    # riceve il risultato; la profondità non consuma lo stack di Python
+    def drive(self, work):
+        stack = self._stack
+        base = len(stack)
+        stack.append(self.block(work) if isinstance(work, list) else work)
+        value, error = None, None
+        while len(stack) > base:
+            top = stack[-1]
+            try:
+                if error is None:
+                    step = top.send(value)
+                else:
+                    e, error = error, None
+                    step = top.throw(e)
+            except StopIteration as done:
+                stack.pop()
+                value = done.value
+                continue
+            except BaseException as e:
+                # l'errore risale al generatore che ha sotto
+                stack.pop()
+                if len(stack) == base: raise
+                value, error = None, e
+                continue
+            value = None
+            stack.append(self.block(step) if isinstance(step, list) else step)
+        return value
+
+    def block(self, stmts):
+        for stmt in stmts:
+            if stmt is None: continue
+            kind = stmt[0]
+
+            # Check alias first
+            if kind == 'call_method' and stmt[2] in self.aliases:
+                yield self.aliases[stmt[2]]
+                continue
+
+            flow = self.flow.get(kind)
+            if flow is not None:
+                yield flow(stmt)
+                continue
+            h = self.dispatch.get(kind)
+            if h is None: continue
+            if _has_calls(stmt): yield from self.value(stmt, h, stmt)
+            else: h(stmt)
+
+    def value(self, stmt, fn, arg):
+        # fn(arg) con le chiamate di zona di stmt eseguite dal driver: ogni
+        # chiamata interrompe fn, la zona gira sullo stack e fn riparte da
+        # capo; le sottoespressioni già valutate restituiscono il valore di
+        # allora, così niente viene riletto né rifatto
+        if not _has_calls(stmt): return fn(arg)
+        ctx = [{}, 0]
+        try:
+            while True:
+                self._replay, self.evaluate = ctx, self.recorded_evaluate
+                try:
+                    return fn(arg)
+                except _NeedCall as call:
+                    self._replay = None
+                    del self.evaluate
+                    result = yield self.zone(call.name, call.args_)
+                    ctx[0][call.at] = (result, call.end)
+                    ctx[1] = 0
+        finally:
+            self._replay = None
+            self.__dict__.pop('evaluate', None)
+
+    def recorded_evaluate(self, expr):
+        # evaluate che numera le sottoespressioni in ordine di visita; una
+        # già valutata salta al numero che seguiva il suo sottoalbero
+        ctx = self._replay
+        if ctx is None: return Runtime.evaluate(self, expr)
+        memo, i = ctx
+        ctx[1] = i + 1
+        done = memo.get(i)
+        if done is not None:
+            ctx[1] = done[1]
+            return done[0]
+        value = Runtime.evaluate(self, expr)
+        memo[i] = (value, ctx[1])
+        return value
+
+
+    # ─── HOOKS ─────────────────────────────────────────
+    # senza iscritti il runtime gira con le tabelle e i metodi normali;
+    # rewire() mette le versioni che avvisano solo dove qualcuno ascolta
+    def add_hooks(self, obj, events=HOOK_EVENTS):
+        for event in events:
+            fn = getattr(obj, 'on_' + event, None)
+            if fn is not None and fn not in self.hooks[event]:
+                self.hooks[event].append(fn)
+        self.rewire()
+
+    def remove_hooks(self, obj):
+        for fns in self.hooks.values():
+            fns[:] = [fn for fn in fns if getattr(fn, '__self__', None) is not obj]
+        self.rewire()
+
+    def govern(self, max_time=None, max_steps=None, max_memory=None, deadline=None, steps=0):
+        # limiti per l'esecuzione: il Governor ascolta ogni istruzione
+        from governor_fig import Governor
+        governor = Governor(self, max_time, max_steps, max_memory, deadline, steps)
+        self.add_hooks(governor, ('statement',))
+        self.governor = governor
+        return governor
+
+    def fire(self, event, *args):
+        for fn in self.hooks[event]: fn(*args)
+
+    def trace(self):
+        # debug on ascolta ogni istruzione, watch solo gli assegnamenti
+        self.remove_hooks(self.tracer)
+        if self.debug_mode: self.add_hooks(self.tracer, ('statement', 'assign'))
+        elif self.watchers: self.add_hooks(self.tracer, ('assign',))
+
+    def rewire(self):
+        hooks = self.hooks
+        dispatch, flow = self.plain_dispatch, self.plain_flow
+        if hooks['assign']:
+            dispatch = dict(dispatch, assign=self.traced_assign)
+        if hooks['statement']:
+            dispatch = {k: self.traced_statement(h, True) for k, h in dispatch.items()}
+            flow = {k: self.traced_statement(h, False) for k, h in flow.items()}
+        # block legge le tabelle a ogni istruzione: il cambio vale subito
+        self.dispatch, self.flow = dispatch, flow
+        if hooks['zone_enter'] or hooks['zone_exit']:
+            self.enter_zone, self.leave_zone = self.traced_enter_zone, self.traced_leave_zone
+        else:
+            self.__dict__.pop('enter_zone', None)
+            self.__dict__.pop('leave_zone', None)
+        if hooks['io']:
+            if not isinstance(self.out, OutTap): self.out = OutTap(self.out, hooks['io'])
+            if not isinstance(self.input, InputTap): self.input = InputTap(self.input, hooks['io'])
+        else:
+            if isinstance(self.out, OutTap): self.out = self.out.out
+            if isinstance(self.input, InputTap): self.input = self.input.input
+
+    def traced_statement(self, handler, replayed):
+        fns = self.hooks['statement']
+        def traced(stmt):
+            # un'istruzione rivalutata dopo una chiamata di zona conta una volta
+            if not replayed or self._replay is None or not self._replay[0]:
+                for fn in fns: fn(stmt)
+            return handler(stmt)
+        return traced
+
+    def traced_enter_zone(self, name, params, args):
+        for fn in self.hooks['zone_enter']: fn(name, args)
+        return type(self).enter_zone(self, name, params, args)
+
+    def traced_leave_zone(self, frame):
+        name = self.zone_calls[-1]
+        type(self).leave_zone(self, frame)
+        for fn in self.hooks['zone_exit']: fn(name)
 
     # ─── ASSIGN ────────────────────────────────────────
     def exec_assign(self, stmt):
         _, name, val_expr, certainty = stmt
         value = self.evaluate(val_expr)
+        # da qui in poi l'assegnamento è fatto: una zona chiamata da un
+        # whenever non deve far ripetere l'istruzione
+        self._replay = None
+        if name in self.variables:
+            self.variables[name].set(value, certainty)
+        else:
+            self.variables[name] = Variable(value, certainty)
+        self.after_assign(name, value)
+
+    def traced_assign(self, stmt):
+        # exec_assign con on_assign: sta nella tabella solo se ci sono iscritti
+        _, name, val_expr, certainty = stmt
+        value = self.evaluate(val_expr)
+        self._replay = None
         old = None
         if name in self.variables:
             old = self.variables[name].set(value, certainty)
         else:
             self.variables[name] = Variable(value, certainty)
-        if self.debug_mode:
-            print(f"  [assign] {name} = {value}")
-        if name in self.watchers and old is not None and old != value:
-            print(f"  [watch] {name} changed: {old} -> {value}")
+        for fn in self.hooks['assign']: fn(name, old, value)
+        self.after_assign(name, value)
+
+    def after_assign(self, name, value):
         if name in self.requires:
             for c in self.requires[name]:
                 self.check_constraint(name, value, c)
@@ -167,14 +516,14 @@ class Runtime:
     # ─── SAY ───────────────────────────────────────────
     def exec_say(self, stmt):
         _, expr = stmt
-        print(self.to_string(self.evaluate(expr)))
+        self.out.line(self.to_string(self.evaluate(expr)))
 
     def exec_say_transform(self, stmt):
         _, expr, transform = stmt
         v = self.to_string(self.evaluate(expr))
-        if transform == 'uppercase':    print(v.upper())
-        elif transform == 'lowercase':  print(v.lower())
-        elif transform == 'capitalized': print(v.title())
+        if transform == 'uppercase':    self.out.line(v.upper())
+        elif transform == 'lowercase':  self.out.line(v.lower())
+        elif transform == 'capitalized': self.out.line(v.title())
 
     def exec_say_context(self, stmt):
         _, expr = stmt
@@ -188,66 +537,98 @@ class Runtime:
             if a.get('described_as'): out += f" [{a['described_as']}]"
             out += f": {self.to_string(value)}"
             if a.get('measured_in'): out += f" {a['measured_in']}"
-            print(out)
+            self.out.line(out)
         else:
-            print(self.to_string(value))
+            self.out.line(self.to_string(value))
 
     # ─── ASK ───────────────────────────────────────────
     def exec_ask(self, stmt):
         _, prompt, name = stmt
-        answer = self._try_number(input(prompt + " "))
+        self.out.flush()
+        answer = self._try_number(self.input(prompt + " "))
         self.variables[name] = Variable(answer)
 
     # ─── IF ────────────────────────────────────────────
     def exec_if(self, stmt):
         _, cond, body, elifs, else_body = stmt
-        if self.eval_condition(cond):
-            for s in body: self.execute(s)
+        if (yield from self.value(stmt, self.eval_condition, cond)):
+            yield body
             return
         for ec, eb in elifs:
-            if self.eval_condition(ec):
-                for s in eb: self.execute(s)
+            if (yield from self.value(stmt, self.eval_condition, ec)):
+                yield eb
                 return
-        for s in else_body: self.execute(s)
+        yield else_body
 
     # ─── UNTIL ─────────────────────────────────────────
     def exec_until(self, stmt):
         _, cond, body = stmt
+        from progress_fig import loop_watch, fingerprint
+        watch = loop_watch(self, stmt)
+        if watch is not None: last = fingerprint(self, *watch)
         i = 0
-        while not self.eval_condition(cond):
-            for s in body: self.execute(s)
+        while not (yield from self.value(stmt, self.eval_condition, cond)):
+            yield body
             i += 1
-            if i >= 10000:
-                print("FigLang: until loop exceeded max iterations"); break
+            if watch is not None:
+                last, before = fingerprint(self, *watch), last
+                if last == before:
+                    self.out.line("FigLang: until loop is stuck: a whole round changed nothing "
+                                  "its condition depends on"); break
+            if i == self.max_until:
+                self.out.line("FigLang: until loop exceeded max iterations"); break
 
     # ─── GIVEN ─────────────────────────────────────────
     def exec_given(self, stmt):
         _, cond, body = stmt
-        if self.eval_condition(cond):
-            for s in body: self.execute(s)
+        if (yield from self.value(stmt, self.eval_condition, cond)):
+            yield body
 
     # ─── REPEAT ────────────────────────────────────────
     def exec_repeat(self, stmt):
         _, n_expr, body = stmt
-        for _ in range(int(self.evaluate(n_expr))):
-            for s in body: self.execute(s)
+        for _ in range(int((yield from self.value(stmt, self.recorded_evaluate, n_expr)))):
+            yield body
 
     # ─── COUNT ─────────────────────────────────────────
     def exec_count(self, stmt):
         _, s_expr, e_expr, body = stmt
-        for i in range(int(self.evaluate(s_expr)), int(self.evaluate(e_expr)) + 1):
+        first = yield from self.value(stmt, self.recorded_evaluate, s_expr)
+        last = yield from self.value(stmt, self.recorded_evaluate, e_expr)
+        for i in range(int(first), int(last) + 1):
             self.variables['it'] = Variable(i)
-            for s in body: self.execute(s)
+            yield body
 
     # ─── FOR EACH ──────────────────────────────────────
     def exec_for_each(self, stmt):
         _, var, col_expr, body = stmt
-        col = self.evaluate(col_expr)
+        col = yield from self.value(stmt, self.recorded_evaluate, col_expr)
         if isinstance(col, list):
-            for item in col:
-                self.variables[var] = Variable(item)
-                self.variables['it'] = Variable(item)
-                for s in body: self.execute(s)
+            yield from self.each_item(var, col, body)
+
+    def each_item(self, var, items, body):
+        for item in items:
+            self.variables[var] = Variable(item)
+            self.variables['it'] = Variable(item)
+            yield body
+
+    def for_each_items(self, var, items, body):
+        self.drive(self.each_item(var, items, body))
+
+    def exec_parallel_for_each(self, stmt):
+        _, var, col_expr, body = stmt
+        col = self.evaluate(col_expr)
+        if not isinstance(col, list): return
+        from parallel_fig import blockers, run_parallel, PARALLEL_MIN_ITEMS
+        reasons = blockers(self, var, body)
+        if reasons or len(col) < PARALLEL_MIN_ITEMS:
+            if reasons and self.debug_mode:
+                self.out.line(f"  [parallel] running in order: {reasons[0]}")
+            self.for_each_items(var, col, body)
+            return
+        # i worker leggono i file: quello che è in sospeso va scritto prima
+        self.files.flush()
+        run_parallel(self, var, col, body)
 
     # ─── WHENEVER ──────────────────────────────────────
     def exec_whenever_def(self, stmt):
@@ -257,6 +638,7 @@ class Runtime:
     def check_whenevers(self):
         for cond, body in self.whenevers:
             if self.eval_condition(cond):
+                if self.hooks['rule_fired']: self.fire('rule_fired', 'whenever', cond)
                 for s in body: self.execute(s)
 
     # ─── EVERY ─────────────────────────────────────────
@@ -275,6 +657,7 @@ class Runtime:
                 self.every_counters[key] = self.every_counters.get(key, 0) + 1
                 if self.every_counters[key] >= n:
                     self.every_counters[key] = 0
+                    if self.hooks['rule_fired']: self.fire('rule_fired', 'every', name)
                     for s in body: self.execute(s)
 
     # ─── ASSUME ────────────────────────────────────────
@@ -321,39 +704,147 @@ class Runtime:
     # ─── PIPELINE ──────────────────────────────────────
     def exec_pipeline(self, stmt):
         _, src_expr, steps = stmt
-        data = self.evaluate(src_expr)
+        # generatore: una zona chiamata in un passo non fa ripetere i say each prima
+        data = yield from self.value(stmt, self.recorded_evaluate, src_expr)
         if not isinstance(data, list): data = [data]
         for step in steps:
             if step[0] == 'keep':
-                val = self.evaluate(step[2])
+                val = yield from self.value(stmt, self.recorded_evaluate, step[2])
                 data = [x for x in data if (x > val if step[1] == 'above' else x < val)]
             elif step[0] == 'double':  data = [x * 2 for x in data]
             elif step[0] == 'sort':    data = sorted(data)
             elif step[0] == 'reverse': data = list(reversed(data))
             elif step[0] == 'say_each':
-                for item in data: print(self.to_string(item))
+                for item in data: self.out.line(self.to_string(item))
 
     # ─── TRY ───────────────────────────────────────────
     def exec_try(self, stmt):
         _, body, fallback = stmt
-        try: self.execute(body)
+        try: yield [body]
         except Exception:
-            if fallback: self.execute(fallback)
+            if fallback: yield [fallback]
 
     # ─── ZONE ──────────────────────────────────────────
     def exec_zone_def(self, stmt):
-        _, name, body = stmt
+        _, name, body, params, remembered, cached, ttl = stmt
         self.zones[name] = body
+        self.zone_params[name] = params
+        # risultati già calcolati, dal meno al più usato di recente
+        if remembered: self.memos[name] = OrderedDict()
+        else: self.memos.pop(name, None)
+        if cached: self.cached_zones[name] = ttl
+        else: self.cached_zones.pop(name, None)
 
     def exec_do_zone(self, stmt):
-        _, name, again = stmt
+        _, name, again, args = stmt
         if name in self.zones:
-            for s in self.zones[name]: self.execute(s)
-        elif name in self.aliases:
-            for s in self.aliases[name]: self.execute(s)
+            values = yield from self.value(stmt, self.evaluate_all, args)
+            # dentro la zona stessa: si riparte da capo, senza un frame nuovo
+            if again and self.zone_calls and self.zone_calls[-1] == name:
+                self.check_arity(name, values)
+                raise _Again(values)
+            yield self.zone(name, values)
+        elif name in self.aliases and not args:
+            yield self.aliases[name]
         else:
             raise NameError(f"FigLang: zone '{name}' is not defined")
 
+    def exec_do_together(self, stmt):
+        _, names = stmt
+        for name in names:
+            if name not in self.zones:
+                raise NameError(f"FigLang: zone '{name}' is not defined")
+        from parallel_fig import can_fork, run_together
+        if not can_fork():
+            # senza fork non c'è una copia dello stato da dare ai figli
+            for name in names: self.execute(('do_zone', name, False, []))
+            return
+        run_together(self, names)
+
+    def exec_give_back(self, stmt):
+        if not self.zone_calls:
+            raise RuntimeError("FigLang: 'give back' can only be used inside a zone")
+        raise _GiveBack(self.evaluate(stmt[1]))
+
+    def evaluate_all(self, exprs):
+        return [self.evaluate(e) for e in exprs]
+
+    def check_arity(self, name, args):
+        params = self.zone_params[name]
+        if len(args) != len(params):
+            raise TypeError(f"FigLang: zone '{name}' takes {len(params)} "
+                            f"value(s) but was given {len(args)}")
+
+    def call_zone(self, name, args):
+        return self.drive(self.zone(name, args))
+
+    def zone(self, name, args):
+        if name not in self.zones:
+            raise NameError(f"FigLang: zone '{name}' is not defined")
+        self.check_arity(name, args)
+        memo = self.memos.get(name)
+        key = None
+        if memo is not None:
+            try:
+                key = _memo_key(args)
+                if key in memo:
+                    memo.move_to_end(key)
+                    return memo[key]
+            except TypeError:
+                key = None
+        if name in self.cached_zones and self.cache_enabled:
+            from cache_fig import run_cached
+            result = run_cached(self, name, args, self.cached_zones[name])
+        else:
+            result = yield from self.zone_body(name, args)
+        if key is not None and self.memo_size > 0:
+            memo[key] = result
+            if len(memo) > self.memo_size: memo.popitem(last=False)
+        return result
+
+    def run_zone(self, name, args):
+        return self.drive(self.zone_body(name, args))
+
+    def zone_body(self, name, args):
+        params = self.zone_params[name]
+        frame = self.enter_zone(name, params, args)
+        try:
+            while True:
+                try:
+                    yield self.zones[name]
+                    return None
+                except _GiveBack as g:
+                    return g.value
+                except _Again as a:
+                    self.leave_zone(frame)
+                    frame = self.enter_zone(name, params, a.args_)
+        finally:
+            self.leave_zone(frame)
+
+    def enter_zone(self, name, params, args):
+        self.zone_calls.append(name)
+        # le zone senza parametri vedono e scrivono le variabili di chi le chiama
+        if not params: return None
+        saved = {}
+        # le variabili locali del chiamante non si vedono dalla zona chiamata
+        if self.scope is not None:
+            for k in [k for k in self.variables if k not in self.scope.known]:
+                saved[k] = self.variables.pop(k)
+        for p in params:
+            if p in self.variables: saved[p] = self.variables[p]
+        frame = Frame(set(self.variables).difference(params), saved, self.scope)
+        for p, v in zip(params, args): self.variables[p] = Variable(v)
+        self.scope = frame
+        return frame
+
+    def leave_zone(self, frame):
+        self.zone_calls.pop()
+        if frame is None: return
+        for k in [k for k in self.variables if k not in frame.known]:
+            del self.variables[k]
+        self.variables.update(frame.saved)
+        self.scope = frame.scope
+
     # ─── ROLE ──────────────────────────────────────────
     def exec_role_def(self, stmt):
         _, name, body = stmt
@@ -363,50 +854,64 @@ class Runtime:
     def exec_watch(self, stmt):
         _, name = stmt
         self.watchers.add(name)
-        print(f"  [watch] now watching '{name}'")
+        self.trace()
+        self.out.line(f"  [watch] now watching '{name}'")
 
     def exec_unwatch(self, stmt):
         _, name = stmt
         self.watchers.discard(name)
-        print(f"  [watch] stopped watching '{name}'")
+        self.trace()
+        self.out.line(f"  [watch] stopped watching '{name}'")
 
     # ─── EXPLAIN ───────────────────────────────────────
     def exec_explain(self, stmt):
         _, name = stmt
+        # una variabile con lo stesso nome ha la precedenza
+        if name == 'performance' and name not in self.variables:
+            for line in self.metrics.report(): self.out.line(line)
+            self.metrics.start()
+            return
+        if name == 'memory' and name not in self.variables:
+            from memory_fig import report
+            self.out.line(f"\n── explain: memory ──────────────────")
+            for line in report(self): self.out.line(line)
+            self.out.line(f"────────────────────────────────────\n")
+            return
         if name not in self.variables:
-            print(f"FigLang: '{name}' is not defined"); return
+            self.out.line(f"FigLang: '{name}' is not defined"); return
         var = self.variables[name]
         v = var.value
-        print(f"\n── explain: {name} ──────────────────")
-        print(f"  current value   : {self.to_string(v)}")
-        print(f"  certainty       : {var.certainty}")
-        print(f"  type            : {self._type_name(v)}")
-        print(f"  changed         : {len(var.history) - 1} time(s)")
-        print(f"  history         : {var.history}")
+        self.out.line(f"\n── explain: {name} ──────────────────")
+        self.out.line(f"  current value   : {self.to_string(v)}")
+        self.out.line(f"  certainty       : {var.certainty}")
+        self.out.line(f"  type            : {self._type_name(v)}")
+        self.out.line(f"  changed         : {len(var.history) - 1} time(s)")
+        self.out.line(f"  history         : {var.history}")
         if isinstance(v, (int, float)):
-            print(f"  highest ever    : {var.highest()}")
-            print(f"  lowest ever     : {var.lowest()}")
+            self.out.line(f"  highest ever    : {var.highest()}")
+            self.out.line(f"  lowest ever     : {var.lowest()}")
             t = "going up" if var.is_going_up() else "going down" if var.is_going_down() else "stable"
-            print(f"  trend           : {t}")
+            self.out.line(f"  trend           : {t}")
         if len(var.history) >= 2:
-            print(f"  previous value  : {var.previous()}")
-        if var.limits: print(f"  limits          : {var.limits}")
+            self.out.line(f"  previous value  : {var.previous()}")
+        if var.limits: self.out.line(f"  limits          : {var.limits}")
         if var.annotations:
             for k, val in var.annotations.items():
-                print(f"  {k:<16}: {val}")
+                self.out.line(f"  {k:<16}: {val}")
         if name in self.requires:
-            print(f"  requirements    : {self.requires[name]}")
+            self.out.line(f"  requirements    : {self.requires[name]}")
         if name in self.state_current:
-            print(f"  current state   : {self.state_current[name]}")
+            self.out.line(f"  current state   : {self.state_current[name]}")
             if name in self.states:
-                print(f"  possible states : {self.states[name]}")
-        print(f"────────────────────────────────────\n")
+                self.out.line(f"  possible states : {self.states[name]}")
+        self.out.line(f"────────────────────────────────────\n")
 
     # ─── DEBUG ─────────────────────────────────────────
     def exec_debug(self, stmt):
         _, mode = stmt
         self.debug_mode = mode
-        print(f"  [debug] {'on' if mode else 'off'}")
+        self.trace()
+        self.out.line(f"  [debug] {'on' if mode else 'off'}")
 
     # ─── SNAPSHOT ──────────────────────────────────────
     def exec_snapshot_take(self, stmt):
@@ -416,47 +921,47 @@ class Runtime:
             snap[k] = {'value': var.value, 'certainty': var.certainty,
                        'history': list(var.history)}
         self.snapshots[name] = snap
-        print(f"  [snapshot] saved '{name}'")
+        self.out.line(f"  [snapshot] saved '{name}'")
 
     def exec_snapshot_restore(self, stmt):
         _, name = stmt
         if name not in self.snapshots:
-            print(f"FigLang: snapshot '{name}' not found"); return
+            self.out.line(f"FigLang: snapshot '{name}' not found"); return
         for k, data in self.snapshots[name].items():
             v = Variable(data['value'], data['certainty'])
             v.history = data['history']
             self.variables[k] = v
-        print(f"  [snapshot] restored '{name}'")
+        self.out.line(f"  [snapshot] restored '{name}'")
 
     # ─── REMEMBER / RECALL / FORGET ────────────────────
     def exec_remember(self, stmt):
         _, name, key = stmt
         if name not in self.variables: return
         with open(f".figlang_{key}.json", 'w') as f:
-            json.dump({'value': self.variables[name].value}, f)
-        print(f"  [remember] saved '{name}' as '{key}'")
+            _json().dump({'value': self.variables[name].value}, f)
+        self.out.line(f"  [remember] saved '{name}' as '{key}'")
 
     def exec_recall(self, stmt):
         _, key, name = stmt
         path = f".figlang_{key}.json"
         if not os.path.exists(path):
-            print(f"FigLang: no memory for '{key}'"); return
+            self.out.line(f"FigLang: no memory for '{key}'"); return
         with open(path) as f:
-            self.variables[name] = Variable(json.load(f)['value'])
-        print(f"  [recall] loaded '{key}' into '{name}'")
+            self.variables[name] = Variable(_json().load(f)['value'])
+        self.out.line(f"  [recall] loaded '{key}' into '{name}'")
 
     def exec_forget(self, stmt):
         _, key = stmt
         path = f".figlang_{key}.json"
-        if os.path.exists(path): os.remove(path); print(f"  [forget] deleted '{key}'")
-        else: print(f"FigLang: no memory for '{key}'")
+        if os.path.exists(path): os.remove(path); self.out.line(f"  [forget] deleted '{key}'")
+        else: self.out.line(f"FigLang: no memory for '{key}'")
 
     # ─── CHECK ─────────────────────────────────────────
     def exec_check(self, stmt):
         _, cond = stmt
         result = self.eval_condition(cond)
         label = self._condition_label(cond)
-        print(f"  {'✓' if result else '✗ FAILED:'} {label}")
+        self.out.line(f"  {'✓' if result else '✗ FAILED:'} {label}")
 
     def _condition_label(self, cond):
         kind = cond[0]
@@ -492,39 +997,81 @@ class Runtime:
     # ─── LISTEN ────────────────────────────────────────
     def exec_listen(self, stmt):
         _, mode, options, name = stmt
+        # prima di leggere: una zona nelle opzioni non fa leggere due volte
+        opts = self.evaluate(options) if mode == 'one_of' else None
         while True:
-            raw = input("> ").strip()
+            self.out.flush()
+            raw = self.input("> ").strip()
             if mode == 'number':
                 try:
                     v = float(raw) if '.' in raw else int(raw)
                     self.variables[name] = Variable(v); break
-                except ValueError: print("  Please enter a valid number.")
+                except ValueError: self.out.line("  Please enter a valid number.")
             elif mode == 'yes_no':
                 if raw.lower() in ('yes','y'):
                     self.variables[name] = Variable(True); break
                 elif raw.lower() in ('no','n'):
                     self.variables[name] = Variable(False); break
-                else: print("  Please answer yes or no.")
+                else: self.out.line("  Please answer yes or no.")
             elif mode == 'one_of':
-                opts = self.evaluate(options)
                 if raw in opts:
                     self.variables[name] = Variable(raw); break
-                else: print(f"  Choose one of: {', '.join(str(o) for o in opts)}")
+                else: self.out.line(f"  Choose one of: {', '.join(str(o) for o in opts)}")
             else:
                 self.variables[name] = Variable(raw); break
 
     # ─── MEASURE ───────────────────────────────────────
     def exec_measure_time(self, stmt):
         _, body = stmt
-        start = time.time()
+        start = self.clock.monotonic()
         for s in body: self.execute(s)
-        self.elapsed = time.time() - start
+        self.elapsed = self.clock.monotonic() - start
         self.variables['elapsed_time'] = Variable(round(self.elapsed, 4))
 
+    # ─── BENCHMARK ─────────────────────────────────────
+    def exec_benchmark(self, stmt):
+        _, n_expr, body, against = stmt
+        n = int((yield from self.value(stmt, self.recorded_evaluate, n_expr)))
+        if n < 1: raise ValueError("benchmark needs at least 1 run")
+        first = timing_stats((yield from self.timed_runs(body, n)))
+        self.maps['benchmark_time'] = first
+        self.variables['benchmark_time'] = Variable(first)
+        self.out.line(f"\n── benchmark ──────────────────────")
+        self.out.line(f"  {n} runs after {max(1, n // 10)} warmup, in milliseconds")
+        if against is None:
+            self.out.line(f"  {self._timing_label(first)}")
+        else:
+            second = timing_stats((yield from self.timed_runs(against, n)))
+            self.maps['benchmark_against'] = second
+            self.variables['benchmark_against'] = Variable(second)
+            self.out.line(f"  benchmark : {self._timing_label(first)}")
+            self.out.line(f"  against   : {self._timing_label(second)}")
+            if first['median']:
+                pct = round((second['median'] - first['median']) / first['median'] * 100, 1)
+                self.out.line(f"  against is {abs(pct)}% {'slower' if pct >= 0 else 'faster'}")
+        self.out.line(f"────────────────────────────────────\n")
+
+    def timed_runs(self, body, n):
+        # un decimo dei giri (almeno uno) scalda il codice e non si misura
+        for _ in range(max(1, n // 10)): yield body
+        times, clock = [], time.perf_counter_ns
+        for _ in range(n):
+            start = clock()
+            yield body
+            times.append(clock() - start)
+        return times
+
+    def _timing_label(self, t):
+        return (f"median {t['median']}  mean {t['mean']}  min {t['min']}  "
+                f"p95 {t['p95']}  stddev {t['stddev']}")
+
     # ─── WAIT ──────────────────────────────────────────
     def exec_wait(self, stmt):
         _, amt_expr = stmt
-        time.sleep(self.evaluate(amt_expr))
+        if self.scheduler is not None:
+            self.scheduler.wait(self, self.evaluate(amt_expr)); return
+        self.out.flush()
+        self.clock.sleep(self.evaluate(amt_expr))
 
     # ─── REACT ─────────────────────────────────────────
     def exec_react(self, stmt):
@@ -534,6 +1081,7 @@ class Runtime:
     def check_reactions(self, changed):
         for rname, (deps, body) in self.reactions.items():
             if changed in deps:
+                if self.hooks['rule_fired']: self.fire('rule_fired', 'react', rname)
                 for s in body: self.execute(s)
 
     # ─── STATES ────────────────────────────────────────
@@ -558,7 +1106,7 @@ class Runtime:
                 raise ValueError(f"FigLang: '{name}' cannot go from '{current}' to '{new_state}'")
         self.state_current[name] = new_state
         self.variables[name] = Variable(new_state)
-        if self.debug_mode: print(f"  [state] {name}: {current} -> {new_state}")
+        if self.debug_mode: self.out.line(f"  [state] {name}: {current} -> {new_state}")
 
     def exec_state_transition(self, stmt):
         _, name, fr, to = stmt
@@ -583,7 +1131,9 @@ class Runtime:
 
     def exec_add_to_group(self, stmt):
         _, item_expr, group = stmt
-        item = self.evaluate(item_expr)
+        self.add_to_group(group, self.evaluate(item_expr))
+
+    def add_to_group(self, group, item):
         if group in self.groups:
             self.groups[group]['items'].append(item)
             self.variables[group].value = self.groups[group]['items']
@@ -601,31 +1151,59 @@ class Runtime:
     def exec_read_file(self, stmt):
         _, fname_expr, var = stmt
         fname = self.to_string(self.evaluate(fname_expr))
+        self.reading(fname)
         try:
             with open(fname) as f:
-                self.variables[var] = Variable(f.read())
+                data = f.read()
         except FileNotFoundError:
             raise FileNotFoundError(f"FigLang: file '{fname}' not found")
+        self.metrics.add('file_bytes_read', len(data.encode()))
+        self.variables[var] = Variable(data)
 
     def exec_write_file(self, stmt):
         _, content_expr, fname_expr = stmt
         content = self.to_string(self.evaluate(content_expr))
         fname = self.to_string(self.evaluate(fname_expr))
-        with open(fname, 'w') as f: f.write(content)
-        print(f"  [file] wrote to '{fname}'")
+        if self.hooks['io']: self.fire('io', 'write', fname)
+        self.metrics.add('file_bytes_written', len(content.encode()))
+        self.files.write(fname, content)
+        if self.file_messages: self.out.line(f"  [file] wrote to '{fname}'")
 
     def exec_append_file(self, stmt):
         _, content_expr, fname_expr = stmt
         content = self.to_string(self.evaluate(content_expr))
         fname = self.to_string(self.evaluate(fname_expr))
-        with open(fname, 'a') as f: f.write(content + '\n')
-        print(f"  [file] appended to '{fname}'")
+        if self.hooks['io']: self.fire('io', 'append', fname)
+        self.metrics.add('file_bytes_written', len(content.encode()) + 1)
+        self.files.append(fname, content + '\n')
+        if self.file_messages: self.out.line(f"  [file] appended to '{fname}'")
 
     def exec_lines_of(self, stmt):
         _, fname_expr, var = stmt
         fname = self.to_string(self.evaluate(fname_expr))
+        self.reading(fname)
         with open(fname) as f:
-            self.variables[var] = Variable(f.read().strip().split('\n'))
+            data = f.read()
+        self.metrics.add('file_bytes_read', len(data.encode()))
+        self.variables[var] = Variable(data.strip().split('\n'))
+
+    def reading(self, fname):
+        if self.hooks['io']: self.fire('io', 'read', fname)
+        self.files.flush(fname)
+        for reads in self.read_paths: reads.add(os.path.abspath(fname))
+
+    def mapped_file(self, fname):
+        self.reading(fname)
+        mf = self.mapped_files.get(fname)
+        if mf is None or mf.is_stale():
+            if mf is not None: mf.close()
+            from files_fig import MappedFile
+            try:
+                mf = MappedFile(fname)
+            except FileNotFoundError:
+                raise FileNotFoundError(f"FigLang: file '{fname}' not found")
+            self.mapped_files[fname] = mf
+        return mf
 
     # ─── TABLE ─────────────────────────────────────────
     def exec_table_def(self, stmt):
@@ -648,7 +1226,7 @@ class Runtime:
         data = self.evaluate(expr)
         if isinstance(data, list):
             for i, item in enumerate(data, 1):
-                print(f"  {i}. {self.to_string(item)}")
+                self.out.line(f"  {i}. {self.to_string(item)}")
 
     def exec_show_bar(self, stmt):
         _, expr = stmt
@@ -657,12 +1235,12 @@ class Runtime:
             mx = max(data.values()) if data else 1
             for k, v in data.items():
                 bars = int((v / mx) * 20)
-                print(f"  {str(k):<12} | {'█' * bars} {v}")
+                self.out.line(f"  {str(k):<12} | {'█' * bars} {v}")
         elif isinstance(data, list):
             mx = max(data) if data else 1
             for i, v in enumerate(data):
                 bars = int((v / mx) * 20)
-                print(f"  {i:<12} | {'█' * bars} {v}")
+                self.out.line(f"  {i:<12} | {'█' * bars} {v}")
 
     def exec_show_sorted(self, stmt):
         _, expr, col_expr = stmt
@@ -671,7 +1249,7 @@ class Runtime:
             col = int(self.evaluate(col_expr)) - 1
             rows = sorted(self.tables[name], key=lambda r: r[col] if col < len(r) else 0)
             for row in rows:
-                print("  " + " | ".join(self.to_string(c) for c in row))
+                self.out.line("  " + " | ".join(self.to_string(c) for c in row))
 
     # ─── VALIDATE ──────────────────────────────────────
     def exec_validate(self, stmt):
@@ -685,38 +1263,40 @@ class Runtime:
         elif vtype == 'number':
             try: float(val); result = True
             except: result = False
-        print(f"  validate {vtype} \"{val}\": {'true' if result else 'false'}")
+        self.out.line(f"  validate {vtype} \"{val}\": {'true' if result else 'false'}")
 
     # ─── LOG ───────────────────────────────────────────
     def exec_log(self, stmt):
         _, msg_expr, level = stmt
         msg = self.to_string(self.evaluate(msg_expr))
-        ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        levels = {'info': '', 'warning': 'WARNING: ', 'error': 'ERROR: '}
-        entry = f"[{ts}] {levels.get(level, '')}{msg}"
-        self.logs.append(entry)
-        print(f"  {entry}")
+        record = self.logs.add(level, msg)
+        self.out.line(f"  {render(record)}")
 
     def exec_save_logs(self, stmt):
-        _, fname_expr = stmt
+        _, fname_expr, level = stmt
         fname = self.to_string(self.evaluate(fname_expr))
+        records = self.logs.select(level)
+        self.files.flush(fname)
         with open(fname, 'w') as f:
-            f.write('\n'.join(self.logs))
-        print(f"  [log] saved {len(self.logs)} entries to '{fname}'")
+            f.write('\n'.join(render(r) for r in records))
+        self.out.line(f"  [log] saved {len(records)} entries to '{fname}'")
 
     # ─── AFTER ─────────────────────────────────────────
     def exec_after(self, stmt):
         _, amt_expr, body = stmt
-        time.sleep(self.evaluate(amt_expr))
+        if self.scheduler is not None:
+            self.scheduler.after(self.evaluate(amt_expr), body); return
+        self.out.flush()
+        self.clock.sleep(self.evaluate(amt_expr))
         for s in body: self.execute(s)
 
     # ─── TIMER ─────────────────────────────────────────
     def exec_start_timer(self, stmt):
-        self.timer_start = time.time()
+        self.timer_start = self.clock.monotonic()
 
     def exec_stop_timer(self, stmt):
         if self.timer_start:
-            self.timer_value = round(time.time() - self.timer_start, 4)
+            self.timer_value = round(self.clock.monotonic() - self.timer_start, 4)
             self.variables['timer'] = Variable(self.timer_value)
 
     # ─── COMPARE ───────────────────────────────────────
@@ -726,27 +1306,27 @@ class Runtime:
         b = self.evaluate(b_expr)
         na = self._expr_label(a_expr)
         nb = self._expr_label(b_expr)
-        print(f"\n── compare ──────────────────────")
-        print(f"  {na} = {self.to_string(a)}")
-        print(f"  {nb} = {self.to_string(b)}")
+        self.out.line(f"\n── compare ──────────────────────")
+        self.out.line(f"  {na} = {self.to_string(a)}")
+        self.out.line(f"  {nb} = {self.to_string(b)}")
         if isinstance(a, (int, float)) and isinstance(b, (int, float)):
             diff = b - a
             sign = '+' if diff >= 0 else ''
-            print(f"  difference: {sign}{diff}")
+            self.out.line(f"  difference: {sign}{diff}")
             if a != 0:
                 pct = round(((b - a) / abs(a)) * 100, 1)
-                print(f"  {nb} is {abs(pct)}% {'higher' if pct >= 0 else 'lower'}")
+                self.out.line(f"  {nb} is {abs(pct)}% {'higher' if pct >= 0 else 'lower'}")
         elif isinstance(a, list) and isinstance(b, list):
             both = [x for x in a if x in b]
             only_a = [x for x in a if x not in b]
             only_b = [x for x in b if x not in a]
-            print(f"  in both     : {both}")
-            print(f"  only in {na} : {only_a}")
-            print(f"  only in {nb} : {only_b}")
+            self.out.line(f"  in both     : {both}")
+            self.out.line(f"  only in {na} : {only_a}")
+            self.out.line(f"  only in {nb} : {only_b}")
         elif isinstance(a, str) and isinstance(b, str):
-            print(f"  same: {'yes' if a == b else 'no'}")
-            print(f"  length: {len(a)} vs {len(b)}")
-        print(f"─────────────────────────────────\n")
+            self.out.line(f"  same: {'yes' if a == b else 'no'}")
+            self.out.line(f"  length: {len(a)} vs {len(b)}")
+        self.out.line(f"─────────────────────────────────\n")
 
     # ─── ALIAS ─────────────────────────────────────────
     def exec_alias(self, stmt):
@@ -762,7 +1342,7 @@ class Runtime:
             elif step == 'capitalize': val = val.title()
             elif step == 'uppercase': val = val.upper()
             elif step == 'lowercase': val = val.lower()
-            elif step == 'say':      print(val)
+            elif step == 'say':      self.out.line(val)
         self.variables[target] = Variable(val)
 
     # ─── CLAMP ─────────────────────────────────────────
@@ -773,43 +1353,30 @@ class Runtime:
         hi = self.evaluate(hi_expr)
         val = max(lo, min(hi, val))
         self.variables[target] = Variable(val)
-        if do_say: print(self.to_string(val))
+        if do_say: self.out.line(self.to_string(val))
 
     # ─── USE ─────────────────────────────────────────
     def exec_use(self, stmt):
         _, path = stmt
         if not path.endswith('.fig'):
             path = path + '.fig'
-        
-        search_paths = [
-            path,
-            os.path.join('libs', path),
-            os.path.join(os.path.dirname(path), 'libs', path),
-        ]
-        
-        found = None
-        for p in search_paths:
-            if os.path.exists(p):
-                found = p
-                break
-        
+        found = find_library(path)
         if not found:
             raise FileNotFoundError(
                 f"FigLang: library '{path}' not found"
             )
         
+        self.reading(found)
         with open(found, 'r') as f:
             source = f.read()
         
-        from lexer import tokenize
-        from parser import parse
-        
-        tokens = tokenize(source)
-        ast = parse(tokens)
+        from parser import parse_source
+        ast = parse_source(source)
+        if asks_for_counts(ast): self.metrics.start()
         self.run(ast)
         
         if self.debug_mode:
-            print(f"  [use] loaded '{found}'")
+            self.out.line(f"  [use] loaded '{found}'")
 
     # ─── EVALUATE ──────────────────────────────────────
     def evaluate(self, expr):
@@ -870,7 +1437,8 @@ class Runtime:
             if op == 'round':  return round(val)
 
         elif kind == 'time_op':
-            now = datetime.now()
+            from datetime import datetime
+            now = datetime.fromtimestamp(self.clock.time())
             if expr[1] == 'time':    return now.strftime('%H:%M:%S')
             if expr[1] == 'date':    return now.strftime('%Y-%m-%d')
             if expr[1] == 'day':     return now.strftime('%A')
@@ -905,18 +1473,18 @@ class Runtime:
         elif kind == 'random_between':
             lo = int(self.evaluate(expr[1]))
             hi = int(self.evaluate(expr[2]))
-            return random.randint(lo, hi)
+            return _random().randint(lo, hi)
 
         elif kind == 'random_from':
             lst = self.evaluate(expr[1])
-            return random.choice(lst) if lst else None
+            return _random().choice(lst) if lst else None
 
         elif kind == 'random_bool':
-            return random.choice([True, False])
+            return _random().choice([True, False])
 
         elif kind == 'shuffled':
             lst = list(self.evaluate(expr[1]))
-            random.shuffle(lst)
+            _random().shuffle(lst)
             return lst
         
         elif kind == 'highest_of':
@@ -985,6 +1553,31 @@ class Runtime:
         elif kind == 'timer_val':
             return self.timer_value
 
+        elif kind == 'file_line':
+            fname = self.to_string(self.evaluate(expr[2]))
+            line = self.mapped_file(fname).line(int(self.evaluate(expr[1])))
+            self.metrics.add('file_bytes_read', len(line.encode()))
+            return line
+
+        elif kind == 'file_lines':
+            fname = self.to_string(self.evaluate(expr[3]))
+            first, last = int(self.evaluate(expr[1])), int(self.evaluate(expr[2]))
+            lines = self.mapped_file(fname).lines(first, last)
+            self.metrics.add('file_bytes_read', sum(len(l.encode()) + 1 for l in lines))
+            return lines
+
+        elif kind == 'file_line_count':
+            return len(self.mapped_file(self.to_string(self.evaluate(expr[1]))))
+
+        elif kind == 'call_zone':
+            _, name, args = expr
+            ctx = self._replay
+            if ctx is None: return self.call_zone(name, [self.evaluate(a) for a in args])
+            # il numero di questa espressione, dato da recorded_evaluate
+            at = ctx[1] - 1
+            args = [self.evaluate(a) for a in args]
+            raise _NeedCall(name, args, at, ctx[1])
+
         elif kind == 'binop':
             _, op, le, re_ = expr
             l = self.evaluate(le)
@@ -1019,7 +1612,7 @@ class Runtime:
             elif op == 'gte':   result = l >= r
             elif op == 'lte':   result = l <= r
             if result and certainty in ('probably', 'maybe'):
-                return random.random() < (0.8 if certainty == 'probably' else 0.5)
+                return _random().random() < (0.8 if certainty == 'probably' else 0.5)
             return result
 
         elif kind == 'between':
@@ -0,0 +1,84 @@
+import signal
+import sys
+from collections import Counter
+
+# si guardano solo gli ultimi generatori dello stack: in una ricorsione
+# profonda leggerli tutti a ogni campione costerebbe più del programma
+MAX_DEPTH = 128
+
+
+class Sampler:
+    # profiler a campioni: un timer di sistema interrompe il programma ogni
+    # interval secondi di CPU e si legge lo stack dei generatori del runtime;
+    # fra un campione e l'altro non si misura niente
+    def __init__(self, runtime, interval=0.005):
+        self.runtime = runtime
+        self.interval = interval
+        self.samples = Counter()
+        self.previous = None
+        self.busy = False
+
+    def start(self):
+        # Windows non ha né SIGPROF né setitimer
+        if not hasattr(signal, 'SIGPROF') or not hasattr(signal, 'setitimer'):
+            raise OSError('--sample is not available on this system (it needs SIGPROF)')
+        try:
+            self.previous = signal.signal(signal.SIGPROF, self._sample)
+        except ValueError:
+            # i segnali si installano solo dal thread principale
+            raise OSError('--sample only works in the main thread')
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        if self.previous is not None:
+            signal.signal(signal.SIGPROF, self.previous)
+            self.previous = None
+
+    def _sample(self, signum, frame):
+        # un campione che arriva mentre si legge il precedente va perso
+        if self.busy: return
+        self.busy = True
+        try:
+            stack = stack_of(self.runtime)
+            if stack: self.samples[stack] += 1
+        finally:
+            self.busy = False
+
+    def report(self, source='', out=sys.stderr, limit=15):
+        text = source.split('\n')
+        total = sum(self.samples.values())
+        print(f"[sample] {total} samples, one every {self.interval * 1000:g} ms of CPU", file=out)
+        if not total: return
+        own, inside, zones = Counter(), Counter(), Counter()
+        for stack, count in self.samples.items():
+            lines = [f for f in stack if f[0] == 'line']
+            if lines: own[lines[-1][1]] += count
+            # una riga o una zona ricorsiva conta una volta per campione
+            for line in {f[1] for f in lines}: inside[line] += count
+            for name in {f[1] for f in stack if f[0] == 'zone'}: zones[name] += count
+        pct = lambda n: f"{100 * n / total:6.1f}%"
+        print(f"[sample] hottest lines{'':<14}{'self':>7}{'total':>8}", file=out)
+        for line, count in own.most_common(limit):
+            snippet = text[line - 1].strip() if line and line <= len(text) else ''
+            print(f"  {line or '?':>4}  {snippet[:25]:<27}{pct(count)} {pct(inside[line])}", file=out)
+        if zones:
+            print(f"[sample] zones{'':<30}{'total':>8}", file=out)
+            for name, count in zones.most_common(limit):
+                print(f"  {name:<41}{pct(count)}", file=out)
+
+
+def stack_of(runtime):
+    # (zona → blocco → riga) ricavato dai generatori su runtime._stack:
+    # un blocco sa quale istruzione sta eseguendo, una zona il suo nome
+    frames = []
+    for gen in runtime._stack[-MAX_DEPTH:]:
+        frame = gen.gi_frame
+        if frame is None: continue
+        kind = gen.gi_code.co_name
+        if kind == 'block':
+            stmt = frame.f_locals.get('stmt')
+            if stmt is not None: frames.append(('line', getattr(stmt, 'line', None)))
+        elif kind == 'zone':
+            frames.append(('zone', frame.f_locals.get('name')))
+    return tuple(frames)
@@ -0,0 +1,88 @@
+import heapq
+import itertools
+import time
+
+
+class Clock:
+    def __init__(self):
+        # secondi passati davvero a dormire, per le metriche
+        self.slept = 0.0
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+            self.slept += seconds
+
+
+class VirtualClock(Clock):
+    # le attese non dormono: spostano solo in avanti l'orologio, che per
+    # il resto scorre insieme a quello reale
+    def __init__(self):
+        super().__init__()
+        self.skipped = 0.0
+
+    def monotonic(self):
+        return time.monotonic() + self.skipped
+
+    def time(self):
+        return time.time() + self.skipped
+
+    def sleep(self, seconds):
+        if seconds > 0: self.skipped += seconds
+
+
+class Scheduler:
+    # modalità event loop: "after" mette il blocco in un heap di timer e lo
+    # script prosegue; "wait" esegue i timer che scadono nel frattempo
+    def __init__(self, clock=None):
+        self.clock = clock if clock is not None else Clock()
+        self.timers = []
+        self.seq = itertools.count()
+        # scadenza del timer in esecuzione: gli "after" annidati partono da
+        # qui e non dall'ora in cui il blocco è davvero partito (niente deriva)
+        self.base = None
+
+    def __len__(self):
+        return len(self.timers)
+
+    def now(self):
+        return self.base if self.base is not None else self.clock.monotonic()
+
+    def after(self, delay, body):
+        heapq.heappush(self.timers, (self.now() + delay, next(self.seq), body))
+
+    def wait(self, runtime, delay):
+        deadline = self.now() + delay
+        self.run_until(runtime, deadline)
+        if self.base is not None:
+            self.base = deadline
+
+    def run_until(self, runtime, deadline):
+        while self.timers and self.timers[0][0] <= deadline:
+            self._fire(runtime)
+        self._sleep_until(runtime, deadline)
+
+    def drain(self, runtime):
+        while self.timers:
+            self._fire(runtime)
+
+    def _fire(self, runtime):
+        when, _, body = heapq.heappop(self.timers)
+        self._sleep_until(runtime, when)
+        outer, self.base = self.base, when
+        try:
+            runtime.run(body)
+        finally:
+            self.base = outer
+
+    def _sleep_until(self, runtime, deadline):
+        delay = deadline - self.clock.monotonic()
+        if delay > 0:
+            runtime.out.flush()
+            self.clock.sleep(delay)
@@ -0,0 +1,174 @@
+import gc
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+
+# il client passa al server i suoi stdin/stdout/stderr: il figlio che
+# esegue lo script scrive direttamente sul terminale di chi l'ha lanciato
+
+
+def default_socket():
+    # niente tempfile: costa più di tutto il resto del client
+    folder = os.environ.get('XDG_RUNTIME_DIR') or os.environ.get('TMPDIR') or '/tmp'
+    return os.path.join(folder, f'figlang-{os.getuid()}.sock')
+
+
+# ─── SERVER ────────────────────────────────────────────
+def serve(path, run):
+    path = path or default_socket()
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            os.unlink(path)
+        else:
+            probe.close()
+            raise ValueError(f"a server is already listening on '{path}'")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    # da qui in poi il socket va tolto comunque, anche con un kill che
+    # arriva subito dopo l'avvio
+    try:
+        os.chmod(path, 0o600)
+        server.listen(64)
+        # i figli non vanno aspettati: il codice d'uscita viaggia sul socket
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        print(f"FigLang server listening on {path}")
+        sys.stdout.flush()
+        # gli oggetti caricati fin qui non vengono più toccati dal gc:
+        # i figli condividono quelle pagine senza copiarle
+        gc.freeze()
+        while True:
+            conn, _ = server.accept()
+            try:
+                _handle(conn, run)
+            except OSError:
+                pass
+            except Exception as e:
+                # una richiesta andata male non deve fermare il server
+                _log(f"request failed: {e!r}")
+            finally:
+                conn.close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        os.unlink(path)
+
+
+def _handle(conn, run):
+    msg, fds, _, _ = socket.recv_fds(conn, 1 << 16, 3)
+    try:
+        req = json.loads(msg)
+    except ValueError:
+        for fd in fds: os.close(fd)
+        return
+    _warm(req)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid:
+        for fd in fds: os.close(fd)
+        return
+    # figlio: prende il posto del processo del client
+    code = 0
+    try:
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        os.chdir(req['cwd'])
+        conn.sendall(f"pid {os.getpid()}\n".encode())
+        code = run(req['args']) or 0
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else 1
+    except BaseException:
+        code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            conn.sendall(f"exit {code}\n".encode())
+        except OSError:
+            pass
+        os._exit(code)
+
+
+def _warm(req):
+    # lo script e le librerie che usa vengono analizzati nel server: il
+    # risultato resta in memoria per tutte le richieste successive
+    from parser import parse_source
+    from runtime import find_library
+    cwd = req['cwd']
+    files = [a for a in req['args'] if a.endswith('.fig')]
+    while files:
+        path = os.path.join(cwd, files.pop())
+        try:
+            with open(path) as f:
+                ast = parse_source(f.read())
+        except (OSError, SyntaxError):
+            continue
+        except Exception as e:
+            # il figlio lo rilegge e riporta l'errore: qui si va avanti
+            _log(f"cannot parse '{path}' ahead: {e!r}")
+            continue
+        for stmt in ast:
+            if stmt and stmt[0] == 'use':
+                lib = stmt[1] if stmt[1].endswith('.fig') else stmt[1] + '.fig'
+                found = find_library(lib, cwd)
+                if found: files.append(found)
+
+
+def _log(text):
+    print(f"[serve] {text}", file=sys.stderr)
+    sys.stderr.flush()
+
+
+# ─── CLIENT ────────────────────────────────────────────
+def request(path, args):
+    # None se non c'è un server: allora si esegue in locale
+    path = path or default_socket()
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(path)
+    except OSError:
+        conn.close()
+        return None
+    # in /tmp chiunque può creare quel nome: stdin, stdout e stderr vanno
+    # solo a un server dello stesso utente
+    if _peer_uid(conn, path) != os.getuid():
+        conn.close()
+        print(f"FigLang: the server on '{path}' belongs to another user, running here",
+              file=sys.stderr)
+        return None
+    msg = json.dumps({'args': args, 'cwd': os.getcwd()}).encode()
+    sys.stdout.flush()
+    socket.send_fds(conn, [msg], [0, 1, 2])
+    child, code = None, 1
+    reply = conn.makefile('r')
+    try:
+        for line in reply:
+            kind, _, value = line.partition(' ')
+            if kind == 'pid': child = int(value)
+            elif kind == 'exit': code = int(value)
+    except KeyboardInterrupt:
+        # Ctrl-C va girato al processo che sta eseguendo lo script
+        if child is not None: os.kill(child, signal.SIGINT)
+        code = 130
+    finally:
+        conn.close()
+    return code
+
+
+def _peer_uid(conn, path):
+    # chi ascolta davvero, dove il sistema lo dice; se no il padrone del file
+    if hasattr(socket, 'SO_PEERCRED'):
+        creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+        return struct.unpack('3i', creds)[1]
+    return os.stat(path).st_uid
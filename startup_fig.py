@@ -0,0 +1,54 @@
+import builtins
+import sys
+import time
+
+
+class StartupProfile:
+    # misura cosa succede prima della prima istruzione dello script:
+    # le fasi di fig.py e il tempo di ogni modulo importato nel frattempo
+    def __init__(self):
+        self.started = self.last = time.perf_counter()
+        self.phases = []
+        self.imports = {}
+        self.children = [0.0]
+        self._import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._import(name, globals, locals, fromlist, level)
+        self.children.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            total = time.perf_counter() - start
+            inner = self.children.pop()
+            self.children[-1] += total
+            # self = tempo del modulo senza quello dei moduli che importa
+            if name not in self.imports:
+                self.imports[name] = (total - inner, total)
+
+    def phase(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def stop(self):
+        builtins.__import__ = self._import
+
+    def report(self, out=sys.stderr, limit=15):
+        self.stop()
+        ms = lambda s: f"{s * 1000:8.2f}"
+        total = time.perf_counter() - self.started
+        print(f"[startup] {total * 1000:.2f} ms from fig.py to the first statement", file=out)
+        for name, spent in self.phases:
+            print(f"  {name:<24}{ms(spent)} ms", file=out)
+        if self.imports:
+            print(f"  {'imports':<24}    self    total (ms)", file=out)
+            ranked = sorted(self.imports.items(), key=lambda kv: -kv[1][0])
+            for name, (own, whole) in ranked[:limit]:
+                print(f"    {name:<22}{ms(own)} {ms(whole)}", file=out)
+            if len(ranked) > limit:
+                rest = sum(own for _, (own, _) in ranked[limit:])
+                print(f"    {len(ranked) - limit} more{'':<15}{ms(rest)}", file=out)
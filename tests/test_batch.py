@@ -0,0 +1,34 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_fig import failure_reason
+
+ERROR = """
+==================================================
+  FigLang Type Error
+  on line 2
+  cannot do math between text and number
+  make sure both values are numbers
+==================================================
+
+
+  [!] Warning: variable "x" is assigned but never used
+"""
+
+
+class FailureReason(unittest.TestCase):
+    def test_reason_comes_from_the_error_block(self):
+        reason = failure_reason({'stdout': ERROR, 'stderr': ''})
+        self.assertEqual(reason, 'Type Error on line 2: cannot do math between text and number')
+
+    def test_block_without_line(self):
+        out = ERROR.replace('  on line 2\n', '')
+        self.assertEqual(failure_reason({'stdout': out, 'stderr': ''}),
+                         'Type Error: cannot do math between text and number')
+
+    def test_falls_back_to_stderr(self):
+        result = {'stdout': 'hello\n', 'stderr': 'Traceback\nRuntimeError: boom\n'}
+        self.assertEqual(failure_reason(result), 'RuntimeError: boom')
@@ -0,0 +1,56 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embed_fig import compile_source
+from runtime import timing_stats
+
+
+def run(source):
+    result = compile_source(source).run()
+    if result.error is not None: raise result.error
+    return result
+
+
+class Stats(unittest.TestCase):
+    def test_known_values(self):
+        stats = timing_stats([i * 10 ** 6 for i in range(1, 101)])
+        self.assertEqual(stats['runs'], 100)
+        self.assertEqual(stats['min'], 1)
+        self.assertEqual(stats['median'], 50.5)
+        self.assertEqual(stats['mean'], 50.5)
+        self.assertEqual(stats['p95'], 95)
+        self.assertAlmostEqual(stats['stddev'], 29.0115, places=4)
+
+    def test_odd_count_and_single_run(self):
+        self.assertEqual(timing_stats([3e6, 1e6, 2e6])['median'], 2)
+        stats = timing_stats([5e6])
+        self.assertEqual((stats['p95'], stats['stddev']), (5, 0))
+
+
+class BenchmarkBlock(unittest.TestCase):
+    def test_warmup_runs_are_not_timed(self):
+        result = run('n is 0\nbenchmark 20 times:\n    n is n + 1\n')
+        self.assertEqual(result.variables['n'], 22)
+        self.assertEqual(result.variables['benchmark_time']['runs'], 20)
+
+    def test_stats_are_readable_from_the_script(self):
+        out = run('benchmark 5 times:\n    x is 1\nsay median of benchmark_time\n').output
+        self.assertGreaterEqual(float(out[-1]), 0)
+
+    def test_against_block(self):
+        source = ('benchmark 10 times:\n    x is 1\nagainst:\n'
+                  '    repeat 200 times:\n        x is 1\n')
+        result = run(source)
+        self.assertEqual(result.variables['benchmark_against']['runs'], 10)
+        self.assertTrue(any(l.startswith('  against is ') for l in result.output))
+
+    def test_needs_one_run(self):
+        result = compile_source('benchmark 0 times:\n    x is 1\n').run()
+        self.assertIsInstance(result.error, ValueError)
+
+
+if __name__ == '__main__':
+    unittest.main()
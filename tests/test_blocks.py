@@ -0,0 +1,58 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexer import tokenize
+from parser import parse
+from runtime import Runtime
+
+
+class _Lines:
+    def __init__(self):
+        self.lines = []
+
+    def line(self, text=''):
+        self.lines.append(text)
+
+    def flush(self): pass
+
+    def close(self): pass
+
+
+def run(source):
+    rt = Runtime()
+    rt.out = _Lines()
+    rt.run(parse(tokenize(source)))
+    return rt.out.lines
+
+
+class IndentedBlocks(unittest.TestCase):
+    # un blocco prende le righe più rientrate della sua intestazione
+    def test_block_ends_where_indentation_does(self):
+        self.assertEqual(run('if 1 is 2:\n    say "a"\nsay "b"\n'), ['b'])
+
+    def test_zone_body_ends_at_dedent(self):
+        self.assertEqual(run('zone called z:\n    say "in"\nsay "out"\ndo z\n'), ['out', 'in'])
+
+    def test_otherwise_binds_to_the_if_at_its_indentation(self):
+        source = ('x is 5\nif x is above 1:\n    if x is above 9:\n        say "big"\n'
+                  'otherwise:\n    say "small"\n')
+        self.assertEqual(run(source), [])
+        source = ('x is 5\nif x is above 1:\n    if x is above 9:\n        say "big"\n'
+                  '    otherwise:\n        say "medium"\n')
+        self.assertEqual(run(source), ['medium'])
+
+    def test_but_if_at_the_same_indentation(self):
+        source = ('x is 5\nif x is above 9:\n    say "big"\n'
+                  'but if x is above 1:\n    say "medium"\notherwise:\n    say "small"\n')
+        self.assertEqual(run(source), ['medium'])
+
+    def test_stray_otherwise_is_an_error(self):
+        with self.assertRaises(SyntaxError):
+            parse(tokenize('say 1\notherwise:\n    say 2\n'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import contextlib
+import io
+import os
+import pickle
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache_fig import ZoneCache
+from embed_fig import compile_source, RuntimePool
+
+
+class _Boom:
+    def __reduce__(self):
+        return (os.system, ('echo pwned',))
+
+
+class ZoneCacheFormat(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.cache = ZoneCache(os.path.join(self.folder.name, 'zones.sqlite'))
+
+    def tearDown(self):
+        self.cache.close()
+        self.folder.cleanup()
+
+    def test_plain_values_come_back(self):
+        self.cache.put('k', 1.0, [], [1, 'a', None], {'x': {'b': 2.5}}, ['out'])
+        self.assertEqual(self.cache.get('k', 2.0), ([], [1, 'a', None], {'x': {'b': 2.5}}, ['out']))
+
+    def test_values_json_would_change_are_not_kept(self):
+        self.cache.put('k', 1.0, [], (1, 2), {}, [])
+        self.cache.put('m', 1.0, [], {1: 'a'}, {}, [])
+        self.assertIsNone(self.cache.get('k', 2.0))
+        self.assertIsNone(self.cache.get('m', 2.0))
+
+    def test_pickled_entry_is_never_loaded(self):
+        blob = pickle.dumps(([], _Boom(), {}, []))
+        with self.cache.db:
+            self.cache.db.execute('INSERT INTO zones VALUES (?, ?, ?, ?, ?)',
+                                  ('k', 1.0, 1.0, len(blob), blob))
+        self.assertIsNone(self.cache.get('k', 2.0))
+
+
+# inner non legge variabili: dentro outer è già in cache
+NESTED = '''zone called inner cached:
+    give back line 1 of "data.txt"
+zone called outer cached:
+    w is do inner
+    give back w
+a is do inner
+b is do outer
+say b
+'''
+
+
+class CachedZones(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.here = os.getcwd()
+        self.env = os.environ.get('XDG_CACHE_HOME')
+        os.chdir(self.folder.name)
+        os.environ['XDG_CACHE_HOME'] = os.path.join(self.folder.name, 'cache')
+
+    def tearDown(self):
+        os.chdir(self.here)
+        if self.env is None: os.environ.pop('XDG_CACHE_HOME', None)
+        else: os.environ['XDG_CACHE_HOME'] = self.env
+        self.folder.cleanup()
+
+    def run_fig(self, source):
+        # un pool nuovo: ogni runtime apre la cache una volta sola
+        pool = RuntimePool(1)
+        try:
+            result = compile_source(source).run(pool=pool)
+        finally:
+            pool.close()
+        if result.error is not None: raise result.error
+        return result.output
+
+    def test_outer_zone_sees_files_of_an_inner_hit(self):
+        with open('data.txt', 'w') as f: f.write('1\n')
+        self.assertEqual(self.run_fig(NESTED)[-1], '1')
+        with open('data.txt', 'w') as f: f.write('22\n')
+        self.assertEqual(self.run_fig(NESTED)[-1], '22')
+
+    def test_unwritable_cache_runs_zones_every_time(self):
+        # una cartella che è un file: la cache non si può creare
+        with open('cache', 'w') as f: f.write('')
+        err = io.StringIO()
+        with contextlib.redirect_stderr(err):
+            out = self.run_fig('zone called z cached:\n    say "ran"\n    give back 1\n'
+                               'do z\ndo z\n')
+        self.assertEqual([l for l in out if l == 'ran'], ['ran', 'ran'])
+        self.assertIn('cannot open the zone cache', err.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
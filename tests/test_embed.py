@@ -0,0 +1,63 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embed_fig import RuntimePool, compile_file, compile_source
+
+
+class RunMany(unittest.TestCase):
+    def setUp(self):
+        self.pool = RuntimePool(1)
+        self.addCleanup(self.pool.close)
+
+    def test_variables_in_output_and_state_out(self):
+        program = compile_source('cost is price * 2\nsay cost\n')
+        for price in (1, 5):
+            result = program.run(variables={'price': price}, pool=self.pool)
+            self.assertIsNone(result.error)
+            self.assertEqual(result.output, [str(price * 2)])
+            self.assertEqual(result.variables, {'price': price, 'cost': price * 2})
+
+    def test_runs_do_not_see_each_other(self):
+        first = compile_source('seen is 1\nzone called z:\n    say "z"\n')
+        second = compile_source('say seen\n')
+        first.run(pool=self.pool)
+        result = second.run(pool=self.pool)
+        # un nome sconosciuto si stampa così com'è
+        self.assertEqual(result.output, ['seen'])
+        self.assertEqual(result.variables, {})
+
+    def test_runtime_is_reused(self):
+        program = compile_source('say 1\n')
+        program.run(pool=self.pool)
+        rt = self.pool.idle[0]
+        program.run(pool=self.pool)
+        self.assertIs(self.pool.idle[0], rt)
+
+    def test_inputs_answer_ask_in_order(self):
+        program = compile_source('ask "x?" -> x\nask "y?" -> y\nsay x + y\n')
+        self.assertEqual(program.run(inputs=[2, 3], pool=self.pool).output, ['5'])
+
+    def test_missing_input_is_an_error(self):
+        result = compile_source('ask "x?" -> x\n').run(pool=self.pool)
+        self.assertIsInstance(result.error, EOFError)
+
+    def test_error_keeps_output_so_far(self):
+        result = compile_source('say "before"\nx is "a" + 1\nsay "after"\n').run(pool=self.pool)
+        self.assertIsNotNone(result.error)
+        self.assertEqual(result.output, ['before'])
+
+    def test_compile_file(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'rule.fig')
+            with open(path, 'w') as f: f.write('say "hi"\n')
+            program = compile_file(path)
+        self.assertEqual(program.name, path)
+        self.assertEqual(program.run(pool=self.pool).output, ['hi'])
+
+
+if __name__ == '__main__':
+    unittest.main()
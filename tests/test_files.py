@@ -0,0 +1,83 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embed_fig import RuntimePool, compile_source
+from files_fig import FilePool
+
+
+def contents(path):
+    with open(path) as f: return f.read()
+
+
+class Pool(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.path = os.path.join(folder.name, 'out.txt')
+
+    def test_appends_wait_for_close(self):
+        files = FilePool()
+        files.append(self.path, 'a\n')
+        files.append(self.path, 'b\n')
+        self.assertEqual(contents(self.path), '')
+        files.close()
+        self.assertEqual(contents(self.path), 'a\nb\n')
+
+    def test_flush_every_n_lines(self):
+        files = FilePool(flush_lines=2)
+        files.append(self.path, 'a\n')
+        self.assertEqual(contents(self.path), '')
+        files.append(self.path, 'b\n')
+        self.assertEqual(contents(self.path), 'a\nb\n')
+        files.close()
+
+    def test_write_drops_pending_appends(self):
+        files = FilePool()
+        files.append(self.path, 'old\n')
+        files.write(self.path, 'new')
+        files.close()
+        self.assertEqual(contents(self.path), 'new')
+
+    def test_oldest_handle_is_closed_and_flushed(self):
+        files = FilePool(max_open=1)
+        other = self.path + '.2'
+        files.append(self.path, 'a\n')
+        files.append(other, 'b\n')
+        self.assertEqual(contents(self.path), 'a\n')
+        self.assertEqual(len(files.handles), 1)
+        files.close()
+
+
+class Scripts(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.cwd = os.getcwd()
+        os.chdir(folder.name)
+        self.addCleanup(os.chdir, self.cwd)
+        self.pool = RuntimePool(1)
+        self.addCleanup(self.pool.close)
+
+    def test_read_sees_pending_writes(self):
+        source = ('write "x" to "f.txt"\nappend "y" to "f.txt"\n'
+                  'read "f.txt" -> t\nsay t\n')
+        result = compile_source(source).run(pool=self.pool)
+        self.assertIsNone(result.error)
+        # write non aggiunge l'a capo, append sì
+        self.assertEqual(result.output[-1], 'xy\n')
+
+    def test_status_lines_can_be_turned_off(self):
+        rt = self.pool.acquire()
+        rt.file_messages = False
+        self.pool.release(rt)
+        result = compile_source('append "y" to "f.txt"\nsay "done"\n').run(pool=self.pool)
+        self.assertEqual(result.output, ['done'])
+        self.assertEqual(contents('f.txt'), 'y\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
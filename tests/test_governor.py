@@ -0,0 +1,49 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embed_fig import compile_source
+from governor_fig import LimitExceeded
+
+
+class StepLimit(unittest.TestCase):
+    def test_exactly_max_steps_statements_run(self):
+        result = compile_source('say 1\nsay 2\nsay 3\n').run(limits={'max_steps': 3})
+        self.assertIsNone(result.error)
+        self.assertEqual(result.output, ['1', '2', '3'])
+
+    def test_one_more_statement_stops(self):
+        result = compile_source('say 1\nsay 2\nsay 3\nsay 4\n').run(limits={'max_steps': 3})
+        self.assertIsInstance(result.error, LimitExceeded)
+        self.assertEqual(result.output, ['1', '2', '3'])
+
+    def test_boundary_past_the_first_check(self):
+        # il controllo vero scatta ogni 1024 istruzioni: il confine deve
+        # essere esatto anche dopo
+        source = 'n is 0\nrepeat 2000 times:\n    n is n + 1\n'
+        result = compile_source(source).run(limits={'max_steps': 2002})
+        self.assertIsNone(result.error)
+        self.assertEqual(result.variables['n'], 2000)
+        result = compile_source(source).run(limits={'max_steps': 2001})
+        self.assertIsInstance(result.error, LimitExceeded)
+        self.assertEqual(result.variables['n'], 1999)
+
+
+class UntilLimit(unittest.TestCase):
+    SOURCE = 'n is 0\nuntil n is above 50:\n    n is n + 1\nsay n\n'
+
+    def test_max_until_in_limits(self):
+        result = compile_source(self.SOURCE).run(limits={'max_until': 5})
+        self.assertIsNone(result.error)
+        self.assertEqual(result.output, ['FigLang: until loop exceeded max iterations', '5'])
+
+    def test_max_until_lasts_one_run(self):
+        program = compile_source(self.SOURCE)
+        program.run(limits={'max_until': 5})
+        self.assertEqual(program.run().output, ['51'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hints_fig import HintScanner, load_hints, scanner, suggest
+
+
+class Matching(unittest.TestCase):
+    def test_whole_words_only(self):
+        self.assertEqual(scanner().scan('saay 1\nsaayer is 2\n'), [(1, 'saay', 'say')])
+
+    def test_longest_match_wins(self):
+        self.assertEqual(scanner().scan('x is 1\nelse if x is 2:\n'), [(2, 'else if', 'but if')])
+
+    def test_correct_form_is_not_an_error(self):
+        self.assertEqual(scanner().scan('for each x in items:\n'), [])
+        self.assertEqual(scanner().scan('for x in items:\n'), [(1, 'for', 'for each')])
+
+    def test_case_does_not_matter(self):
+        self.assertEqual(scanner().scan('PRINT 1\n'), [(1, 'print', 'say')])
+
+    def test_overlapping_suffixes(self):
+        # "he" sta dentro "she" e "hers" ma non come parola intera
+        found = HintScanner({'he': 'x', 'she': 'y', 'hers': 'z'}).scan('she hers\n')
+        self.assertEqual(found, [(1, 'she', 'y'), (1, 'hers', 'z')])
+
+    def test_suggest_text(self):
+        self.assertEqual(suggest('iff x is 1:\n'),
+                         ["  line 1: did you mean 'if' instead of 'iff'?"])
+
+
+class HintFiles(unittest.TestCase):
+    def write(self, text):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        path = os.path.join(folder.name, 'hints.txt')
+        with open(path, 'w') as f: f.write(text)
+        return path
+
+    def test_extra_hints_are_added(self):
+        path = self.write('# team words\nshout -> say\n')
+        self.assertEqual(load_hints(path), {'shout': 'say'})
+        self.assertEqual(scanner([path]).scan('shout 1\n'), [(1, 'shout', 'say')])
+
+    def test_bad_line(self):
+        with self.assertRaises(ValueError):
+            load_hints(self.write('shout say\n'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import gzip
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logs_fig import FileSink
+
+
+class Rotation(unittest.TestCase):
+    def test_file_never_passes_the_limit(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'run.log')
+            sink = FileSink(path, max_bytes=2000, backups=3, interval=60)
+            for i in range(300): sink.put((time.monotonic(), 'info', f'message {i}'))
+            sink.close()
+            self.assertLessEqual(os.path.getsize(path), 2000)
+            with gzip.open(path + '.1.gz') as f:
+                self.assertLessEqual(len(f.read()), 2000)
+            with open(path) as f:
+                self.assertTrue(f.read().endswith('message 299\n'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import io
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embed_fig import _Lines, compile_source
+from lexer import tokenize
+from parser import parse
+from runtime import Runtime
+from memory_fig import MemoryGuard, deep_size, parse_size, size_text
+
+GROWING = 'big is "x"\nrepeat 50 times:\n    big is big and "xxxxxxxxxx"\nsmall is 1\n'
+
+
+class Sizes(unittest.TestCase):
+    def test_shared_values_count_once(self):
+        item = 'y' * 1000
+        self.assertLess(deep_size([item] * 100), 2 * deep_size([item]) + 1000)
+
+    def test_nested_containers(self):
+        self.assertGreater(deep_size({'a': ['y' * 1000]}), 1000)
+
+    def test_parse_size(self):
+        self.assertEqual(parse_size('500000'), 500000)
+        self.assertEqual(parse_size('64kb'), 64 << 10)
+        self.assertEqual(parse_size('10 MB'), 10 << 20)
+        with self.assertRaises(ValueError): parse_size('10 parsecs')
+
+    def test_size_text(self):
+        self.assertEqual(size_text(100), '100 B')
+        self.assertEqual(size_text(1536), '1.5 KiB')
+        self.assertEqual(size_text(3 << 30), '3.0 GiB')
+
+
+class ExplainMemory(unittest.TestCase):
+    def test_largest_first_with_history(self):
+        out = compile_source(GROWING + 'explain memory\n').run().output
+        rows = [l.split() for l in out if l.startswith('  variable')]
+        self.assertEqual([r[1] for r in rows], ['big', 'small'])
+        self.assertIn('51', rows[0])
+
+    def test_script_variable_named_memory(self):
+        out = compile_source('memory is 3\nexplain memory\n').run().output
+        self.assertFalse(any('item(s)' in l for l in out))
+
+
+class SoftLimit(unittest.TestCase):
+    def test_warns_once_per_variable(self):
+        rt = Runtime()
+        rt.out = _Lines()
+        rt.add_hooks(MemoryGuard(rt, 2000), ('assign',))
+        with mock.patch('sys.stderr', io.StringIO()) as stderr:
+            rt.run(parse(tokenize(GROWING)))
+        warnings = stderr.getvalue().splitlines()
+        self.assertEqual(len(warnings), 1)
+        self.assertIn("'big'", warnings[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embed_fig import compile_source
+
+
+class ExplainPerformance(unittest.TestCase):
+    def counted(self, source):
+        out = compile_source(source).run().output
+        return next(l for l in out if 'statements executed' in l).split(':')[1].strip()
+
+    def test_counts_from_the_start(self):
+        self.assertEqual(self.counted('x is 1\nx is 2\nexplain performance\n'), '3')
+
+    def test_found_inside_a_block_with_extra_spaces(self):
+        source = 'x is 1\nx is 2\nif x is 2:\n    explain  performance\n'
+        self.assertEqual(self.counted(source), '4')
+
+
+class FileBytes(unittest.TestCase):
+    def test_read_and_written_both_count_bytes(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'accents.txt').replace('\\', '/')
+            source = (f'write "ééé" to "{path}"\nread "{path}" -> t\n'
+                      f'say line 1 of "{path}"\nexplain performance\n')
+            out = compile_source(source).run().output
+        counted = {l.split(':')[0].strip(): l.split(':')[1].strip() for l in out if ':' in l}
+        self.assertEqual(counted['bytes written or appended to files'], '6')
+        # read e line 1 of: due letture da 6 byte
+        self.assertEqual(counted['bytes read from files'], '12')
+
+
+if __name__ == '__main__':
+    unittest.main()
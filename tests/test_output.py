@@ -0,0 +1,65 @@
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexer import tokenize
+from parser import parse
+from runtime import Runtime
+from output_fig import Output
+
+
+class Buffering(unittest.TestCase):
+    def test_lines_wait_for_flush(self):
+        with mock.patch('sys.stdout', io.StringIO()) as stdout:
+            out = Output()
+            out.line('a')
+            out.line('b')
+            self.assertEqual(stdout.getvalue(), '')
+            out.flush()
+            self.assertEqual(stdout.getvalue(), 'a\nb\n')
+
+    def test_full_buffer_is_written(self):
+        with mock.patch('sys.stdout', io.StringIO()) as stdout:
+            out = Output(buffer_size=8)
+            out.line('1234')
+            self.assertEqual(stdout.getvalue(), '')
+            out.line('5678')
+            self.assertEqual(stdout.getvalue(), '1234\n5678\n')
+
+    def test_unbuffered_prints_every_line(self):
+        with mock.patch('sys.stdout', io.StringIO()) as stdout:
+            out = Output(unbuffered=True)
+            out.line('a')
+            self.assertEqual(stdout.getvalue(), 'a\n')
+
+    def test_output_to_a_file(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'out.txt')
+            with mock.patch('sys.stdout', io.StringIO()) as stdout:
+                out = Output(path)
+                out.line('a')
+                out.close()
+            self.assertEqual(stdout.getvalue(), '')
+            with open(path) as f: self.assertEqual(f.read(), 'a\n')
+
+
+class FlushBeforeAsk(unittest.TestCase):
+    def test_prompt_comes_after_the_output(self):
+        seen = []
+        with mock.patch('sys.stdout', io.StringIO()) as stdout:
+            rt = Runtime()
+            rt.input = lambda prompt: seen.append(stdout.getvalue()) or '3'
+            rt.run(parse(tokenize('say "before"\nask "n?" -> n\nsay n\n')))
+            rt.finish()
+            rt.close()
+            self.assertEqual(seen, ['before\n'])
+            self.assertEqual(stdout.getvalue(), 'before\n3\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from embed_fig import RuntimePool, compile_source
+from governor_fig import LimitExceeded
+from parallel_fig import blockers, can_fork
+from runtime import Runtime
+
+TOGETHER = ('zone called spin:\n    n is 0\n    until n is above 1000:\n        n is n + 1\n'
+            'zone called other:\n    say "other"\ndo spin and other together\nsay "after"\n')
+
+
+LOOP = ('squares is a group of numbers\nfor each x in items{}:\n    y is x * x\n'
+        '    say "item " and x\n    add y to squares\n    append "line " and y to "out.txt"\n'
+        'say squares\n')
+
+
+class ParallelForEach(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.cwd = os.getcwd()
+        os.chdir(folder.name)
+        self.addCleanup(os.chdir, self.cwd)
+
+    def run_loop(self, parallel):
+        pool = RuntimePool(1)
+        self.addCleanup(pool.close)
+        program = compile_source(LOOP.format(' in parallel' if parallel else ''))
+        result = program.run(variables={'items': list(range(200))}, pool=pool)
+        self.assertIsNone(result.error)
+        with open('out.txt') as f: written = f.read()
+        os.remove('out.txt')
+        return result, written
+
+    def test_same_results_as_the_sequential_loop(self):
+        self.assertEqual(blockers(Runtime(), 'x', compile_source(LOOP.format(' in parallel')).ast[1][3]), [])
+        result, written = self.run_loop(True)
+        expected, expected_written = self.run_loop(False)
+        self.assertEqual(result.output, expected.output)
+        self.assertEqual(written, expected_written)
+        self.assertEqual(result.variables['y'], 199 * 199)
+        self.assertEqual(result.variables['squares'], expected.variables['squares'])
+
+    def test_blockers_name_the_reason(self):
+        body = compile_source('for each x in items in parallel:\n    t is t + x\n').ast[0][3]
+        self.assertIn("'t' carries a value from one item to the next", blockers(Runtime(), 'x', body))
+        body = compile_source('for each x in items in parallel:\n    say random number between 1 and 3\n').ast[0][3]
+        self.assertIn('random values depend on the order of the items', blockers(Runtime(), 'x', body))
+
+
+class ParallelUnderLimits(unittest.TestCase):
+    def test_steps_of_all_workers_count(self):
+        # ogni chunk resta sotto il limite, la somma no
+        program = compile_source('for each x in items in parallel:\n    say x\nsay "after"\n')
+        result = program.run(variables={'items': list(range(200))}, limits={'max_steps': 100})
+        self.assertIsInstance(result.error, LimitExceeded)
+        self.assertNotIn('after', result.output)
+
+    def test_workers_use_max_until(self):
+        source = ('for each x in items in parallel:\n    n is 0\n'
+                  '    until n is above 50:\n        n is n + 1\n    say n\n')
+        result = compile_source(source).run(variables={'items': list(range(100))},
+                                            limits={'max_until': 5})
+        self.assertIsNone(result.error)
+        self.assertEqual(result.output[:2], ['FigLang: until loop exceeded max iterations', '5'])
+
+
+@unittest.skipUnless(can_fork(), 'needs fork')
+class TogetherUnderLimits(unittest.TestCase):
+    def test_step_limit_inside_a_zone_reaches_the_parent(self):
+        result = compile_source(TOGETHER).run(limits={'max_steps': 50})
+        self.assertIsInstance(result.error, LimitExceeded)
+        self.assertNotIn('after', result.output)
+
+    def test_command_line_stops_instead_of_hanging(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'together.fig')
+            with open(path, 'w') as f: f.write(TOGETHER)
+            done = subprocess.run([sys.executable, os.path.join(ROOT, 'fig.py'), path,
+                                   '--max-steps', '50'], capture_output=True, text=True, timeout=60)
+        self.assertEqual(done.returncode, 1)
+        self.assertIn('Limit Error', done.stdout + done.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embed_fig import compile_source
+
+
+def run(source):
+    result = compile_source(source).run()
+    if result.error is not None: raise result.error
+    return result
+
+
+class StuckUntil(unittest.TestCase):
+    def test_round_without_changes_stops(self):
+        out = run('n is 0\nuntil n is above 5:\n    say "round"\n').output
+        self.assertEqual(out[0], 'round')
+        self.assertTrue(out[1].startswith('FigLang: until loop is stuck'))
+
+    def test_maybe_comparison_is_not_stuck(self):
+        # "is maybe 0" vale la metà delle volte: un giro senza cambi non
+        # dice niente sul giro dopo
+        source = ('n is 0\ndone is 0\nuntil done is 1:\n'
+                  '    if n is maybe 0:\n        done is 1\n')
+        for _ in range(20):
+            result = run(source)
+            self.assertEqual(result.output, [])
+            self.assertEqual(result.variables['done'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import os
+import sys
+import threading
+import types
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sample_fig
+from runtime import Runtime
+
+
+class SamplerStart(unittest.TestCase):
+    def test_system_without_sigprof(self):
+        with mock.patch.object(sample_fig, 'signal', types.SimpleNamespace()):
+            with self.assertRaises(OSError) as caught:
+                sample_fig.Sampler(Runtime()).start()
+        self.assertIn('not available', str(caught.exception))
+
+    @unittest.skipUnless(hasattr(sample_fig.signal, 'SIGPROF'), 'needs SIGPROF')
+    def test_outside_the_main_thread(self):
+        errors = []
+        def start():
+            try: sample_fig.Sampler(Runtime()).start()
+            except OSError as e: errors.append(e)
+        thread = threading.Thread(target=start)
+        thread.start()
+        thread.join()
+        self.assertEqual(len(errors), 1)
+        self.assertIn('main thread', str(errors[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
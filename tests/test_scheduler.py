@@ -0,0 +1,50 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexer import tokenize
+from parser import parse
+from runtime import Runtime
+from embed_fig import _Lines
+from scheduler_fig import Scheduler, VirtualClock
+
+
+def run(source):
+    # event loop su un orologio virtuale: nessuna attesa vera
+    rt = Runtime()
+    rt.out = _Lines()
+    rt.clock = VirtualClock()
+    rt.scheduler = Scheduler(rt.clock)
+    rt.run(parse(tokenize(source)))
+    rt.finish()
+    return rt.out.lines, rt.clock.skipped
+
+
+class EventLoop(unittest.TestCase):
+    def test_timers_fire_by_deadline_after_the_script(self):
+        out, slept = run('after 3 seconds:\n    say "three"\n'
+                         'after 1 second:\n    say "one"\nsay "main"\n')
+        self.assertEqual(out, ['main', 'one', 'three'])
+        # i ritardi si sovrappongono, non si sommano
+        self.assertAlmostEqual(slept, 3, places=2)
+
+    def test_wait_runs_the_timers_that_fall_due(self):
+        out, _ = run('after 1 second:\n    say "timer"\n'
+                     'after 5 seconds:\n    say "late"\nwait 2 seconds\nsay "main"\n')
+        self.assertEqual(out, ['timer', 'main', 'late'])
+
+    def test_nested_after_starts_from_the_deadline(self):
+        out, slept = run('after 1 second:\n    after 1 second:\n        say "nested"\n')
+        self.assertEqual(out, ['nested'])
+        self.assertAlmostEqual(slept, 2, places=2)
+
+    def test_many_pending_timers(self):
+        source = 'count from 1 to 5000:\n    after it seconds:\n        say it\n'
+        out, _ = run(source)
+        self.assertEqual(len(out), 5000)
+
+
+if __name__ == '__main__':
+    unittest.main()
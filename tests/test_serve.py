@@ -0,0 +1,66 @@
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from serve_fig import request
+
+FIG = os.path.join(ROOT, 'fig.py')
+
+
+@unittest.skipUnless(hasattr(socket, 'send_fds') and hasattr(os, 'fork'), 'needs fd passing and fork')
+class Server(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.folder = folder.name
+        self.socket = os.path.join(self.folder, 's.sock')
+        self.server = subprocess.Popen([sys.executable, FIG, '--serve', '--socket', self.socket],
+                                       stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        self.addCleanup(self.stop)
+        # la prima riga arriva quando il socket è pronto
+        self.assertIn('listening', self.server.stdout.readline())
+
+    def stop(self):
+        self.server.terminate()
+        self.server.wait(timeout=10)
+        self.server.stdout.close()
+
+    def client(self, source):
+        path = os.path.join(self.folder, 'job.fig')
+        with open(path, 'w') as f: f.write(source)
+        return subprocess.run([sys.executable, FIG, path, '--client', '--socket', self.socket],
+                              capture_output=True, text=True, timeout=60, cwd=self.folder)
+
+    def test_script_output_and_exit_code(self):
+        done = self.client('say "hello"\n')
+        self.assertEqual(done.returncode, 0)
+        self.assertEqual(done.stdout, 'hello\n')
+
+    def test_error_exits_with_one(self):
+        done = self.client('x is "a" + 1\n')
+        self.assertEqual(done.returncode, 1)
+        self.assertIn('Type Error', done.stdout)
+
+    def test_server_survives_a_failed_script(self):
+        self.client('x is "a" + 1\n')
+        self.assertEqual(self.client('say 1\n').returncode, 0)
+
+    def test_socket_is_removed_on_stop(self):
+        self.stop()
+        self.assertFalse(os.path.exists(self.socket))
+
+
+class NoServer(unittest.TestCase):
+    def test_request_without_a_server(self):
+        with tempfile.TemporaryDirectory() as folder:
+            self.assertIsNone(request(os.path.join(folder, 'none.sock'), ['x.fig']))
+
+
+if __name__ == '__main__':
+    unittest.main()
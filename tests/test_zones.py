@@ -0,0 +1,46 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embed_fig import compile_source
+
+
+def run(source, **kw):
+    result = compile_source(source).run(**kw)
+    if result.error is not None: raise result.error
+    return result
+
+
+class ZoneCallsInExpressions(unittest.TestCase):
+    # una zona chiamata a metà espressione non deve far rileggere né
+    # rifare quello che l'istruzione aveva già fatto prima della chiamata
+    def test_operand_read_before_the_call(self):
+        out = run("x is 1\nzone called bump:\n    x is x + 1\n    give back x\n"
+                  "say x + (do bump)\n").output
+        self.assertEqual(out, ['3'])
+
+    def test_operand_changed_by_the_zone(self):
+        out = run("y is 10\nzone called grow:\n    y is y * 2\n    give back 0\n"
+                  "say y + (do grow)\nsay y\n").output
+        self.assertEqual(out, ['10', '20'])
+
+    def test_pipeline_steps_before_the_call(self):
+        out = run("zone called lim:\n    give back 1\n"
+                  "start with [1, 2, 3], say each, keep above do lim, say each\n").output
+        self.assertEqual(out, ['1', '2', '3', '2', '3'])
+
+    def test_two_calls_in_one_statement(self):
+        out = run("n is 0\nzone called next:\n    n is n + 1\n    give back n\n"
+                  "say (do next) * 10 + (do next)\n").output
+        self.assertEqual(out, ['12'])
+
+    def test_deep_recursion(self):
+        out = run("zone called deep with n:\n    if n is below 1:\n        give back 0\n"
+                  "    give back 1 + (do deep with n - 1)\nsay do deep with 5000\n").output
+        self.assertEqual(out, ['5000'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -43,6 +43,11 @@ def analyze(ast, source):
                 )
             for s in body: check_node(s)
 
+        elif kind == 'benchmark':
+            _, n, body, against = node
+            _collect_vars(n, used)
+            for s in body + (against or []): check_node(s)
+
         elif kind == 'until':
             _, cond, body = node
             _collect_vars_cond(cond, used)
@@ -61,17 +66,27 @@ def analyze(ast, source):
             _, name, constraints = node
             requires[name] = constraints
 
-        elif kind == 'for_each':
+        elif kind in ('for_each', 'parallel_for_each'):
             _, var, col, body = node
             assigned.add(var)
             _collect_vars(col, used)
             for s in body: check_node(s)
 
         elif kind == 'zone_def':
-            _, name, body = node
+            _, name, body = node[:3]
             assigned.add(name)
             for s in body: check_node(s)
 
+        elif kind == 'do_zone':
+            used.add(node[1])
+            for a in node[3]: _collect_vars(a, used)
+
+        elif kind == 'do_together':
+            used.update(node[1])
+
+        elif kind == 'give_back':
+            _collect_vars(node[1], used)
+
     for stmt in ast:
         check_node(stmt)
 
@@ -108,6 +123,12 @@ def _collect_vars(expr, used):
     elif expr[0] == 'list':
         for item in expr[1]:
             _collect_vars(item, used)
+    elif expr[0] == 'call_zone':
+        used.add(expr[1])
+        for a in expr[2]: _collect_vars(a, used)
+    elif expr[0] in ('file_line', 'file_lines', 'file_line_count'):
+        for part in expr[1:]:
+            _collect_vars(part, used)
 
 
 def _collect_vars_cond(cond, used):